@@ -0,0 +1,170 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [directory] [options]"
+    )
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("-n", "--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="FILE",
+                        help="write results as JSON to FILE")
+    parser.add_argument("--lean", action="store_true",
+                        help="load only the graph")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    start = time.perf_counter()
+    degrees.load_data(args.directory, lean_load=args.lean)
+    load_seconds = time.perf_counter() - start
+    print(f"Data loaded in {load_seconds:.2f} s.")
+
+    pairs = sample_pairs(args.queries, args.seed)
+    print(f"Sampled {len(pairs)} connected pairs.")
+
+    results = {}
+    for name, search in SEARCHES.items():
+        results[name] = run_search(search, pairs)
+
+    print(f"{len(pairs)} queries")
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(f"  {name}: "
+              f"p50 {latency['p50']:.2f} ms, "
+              f"p95 {latency['p95']:.2f} ms, "
+              f"p99 {latency['p99']:.2f} ms, "
+              f"{result['num_explored']['mean']:.1f} people explored, "
+              f"{result['peak_memory_kb']['max']:.0f} KB peak memory")
+        if result["mismatches"]:
+            print(f"    {result['mismatches']} paths differ in length "
+                  "from the single-source distances")
+
+    if args.output:
+        report = {
+            "directory": args.directory,
+            "lean": args.lean,
+            "queries": len(pairs),
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+            "load_seconds": load_seconds,
+            "searches": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+def sample_pairs(n, seed):
+    """
+    Returns `n` (source, target, degrees) tuples of distinct connected
+    people, chosen reproducibly from `seed`.
+    """
+    rng = random.Random(seed)
+    graph = degrees.graph
+    pairs = []
+    attempts = 0
+    while len(pairs) < n:
+        attempts += 1
+        if attempts > 100 * n:
+            sys.exit("Could not find enough connected pairs.")
+        source = rng.randrange(graph.num_people())
+        distances, _, _ = degrees.single_source(source)
+        reachable = [
+            person for person, distance in enumerate(distances)
+            if distance > 0
+        ]
+        if not reachable:
+            continue
+        target = rng.choice(reachable)
+        pairs.append((
+            graph.person_ids[source],
+            graph.person_ids[target],
+            distances[target]
+        ))
+    return pairs
+
+
+def run_search(search, pairs):
+    """
+    Runs `search` on each pair, timing it in one pass and tracing its
+    peak memory in a second, and returns summary statistics.
+    """
+    latencies = []
+    explored = []
+    mismatches = 0
+    for source, target, distance in pairs:
+        stats = {}
+        start = time.perf_counter()
+        path = search(source, target, stats=stats)
+        latencies.append((time.perf_counter() - start) * 1000)
+        explored.append(stats.get("num_explored", 0))
+        if path is None or len(path) != distance:
+            mismatches += 1
+
+    peaks = []
+    for source, target, _ in pairs:
+        tracemalloc.start()
+        search(source, target)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+
+    return {
+        "latency_ms": summarize(latencies),
+        "num_explored": summarize(explored),
+        "peak_memory_kb": summarize(peaks),
+        "mismatches": mismatches,
+    }
+
+
+def summarize(values):
+    """Returns the mean, max and p50/p95/p99 of `values`."""
+    ordered = sorted(values)
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1],
+    }
+
+
+def percentile(ordered, p):
+    """Returns the nearest-rank `p`th percentile of sorted `ordered`."""
+    rank = max(1, -(-p * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def single_source_search(source, target, stats=None):
+    """
+    Answers one query with a full single-source search, as a baseline.
+    """
+    graph = degrees.graph
+    distances, parents, via = degrees.single_source(
+        graph.person_index[source]
+    )
+    if stats is not None:
+        stats["num_explored"] = sum(1 for d in distances if d != -1)
+    return degrees.path_from_parents(
+        distances, parents, via, graph.person_index[target]
+    )
+
+
+SEARCHES = {
+    "unidirectional": degrees.shortest_path,
+    "bidirectional": degrees.shortest_path_bidirectional,
+    "single_source": single_source_search,
+}
+
+
+if __name__ == "__main__":
+    main()
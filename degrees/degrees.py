@@ -1,30 +1,95 @@
+import argparse
 import csv
+import json
+import multiprocessing
+import os
 import sys
+import time
+from array import array
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
+import snapshot
+from graph import SortedIds, StarGraph, index_ids
+from nameindex import NameIndex
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# Maps person_ids to a dictionary of: name, birth
 people = {}
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# Maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# NameIndex over the keys of `names`, for prefix and fuzzy lookups
+name_index = None
 
-def load_data(directory):
+# If only the graph was loaded, the graph indices of the people with
+# the `k`th name of `name_index` are
+# `name_people[name_offsets[k]:name_offsets[k + 1]]`
+name_offsets = None
+name_people = None
+
+# StarGraph of who starred in what, indexed by dense integers
+graph = None
+
+# Directory the current data was loaded from
+data_directory = None
+
+# Whether only the graph and names were loaded, with the rest read on demand
+lean = False
+
+# File names of the binary snapshots written next to the CSV files
+SNAPSHOT = "degrees.snapshot"
+LEAN_SNAPSHOT = "degrees-lean.snapshot"
+
+
+def load_data(directory, cache=True, lean_load=False):
     """
     Load data from CSV files into memory.
+
+    If `cache` is true, the parsed data is saved to a snapshot in
+    `directory` and memory-mapped on later calls instead of re-reading
+    the CSV files, for as long as their sizes and modification times
+    are unchanged.
+
+    If `lean_load` is true, only the graph is loaded; see `load_graph`.
     """
+    global graph, name_index, data_directory, lean
+
+    data_directory = directory
+    lean = lean_load
+    source = snapshot.fingerprint(_csv_paths(directory)) if cache else None
+    if lean:
+        load_graph(directory, source)
+        return
+
+    path = os.path.join(directory, SNAPSHOT)
+    if cache:
+        loaded = snapshot.read_snapshot(path, source)
+        if loaded is not None:
+            arrays, data = loaded
+            names.update(data["names"])
+            people.update(data["people"])
+            movies.update(data["movies"])
+            name_index = NameIndex(*data["name_index"])
+            graph = StarGraph(
+                list(people), list(movies),
+                arrays["person_offsets"], arrays["person_movies"],
+                arrays["movie_offsets"], arrays["movie_stars"]
+            )
+            return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:            # id,name,birth
             people[row["id"]] = {     # 102,"Kevin Bacon",1958
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
@@ -39,32 +104,264 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
         #print(movies)
 
-    # Load stars
+    # Load stars, interning ids to the indices used by the graph
+    person_index = {person_id: i for i, person_id in enumerate(people)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movies)}
+    edge_people = array("i")
+    edge_movies = array("i")
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                person = person_index[row["person_id"]]
+                movie = movie_index[row["movie_id"]]
             except KeyError:
-                pass
-        #print(people)
-        #print(movies)
+                continue
+            edge_people.append(person)
+            edge_movies.append(movie)
+
+    graph = StarGraph.from_edges(
+        list(people), list(movies), edge_people, edge_movies
+    )
+    name_index = NameIndex.build(names)
+
+    if cache:
+        arrays = {
+            "person_offsets": graph.person_offsets,
+            "person_movies": graph.person_movies,
+            "movie_offsets": graph.movie_offsets,
+            "movie_stars": graph.movie_stars,
+        }
+        data = {
+            "names": names,
+            "people": people,
+            "movies": movies,
+            "name_index": (name_index.keys, name_index.reversed_keys),
+        }
+        try:
+            snapshot.write_snapshot(path, source, arrays, data)
+        except OSError:
+            pass
+
+
+def load_graph(directory, source=None):
+    """
+    Load only the graph from CSV files, streaming them row by row and
+    keeping ids and adjacency in typed arrays. Names are kept only as a
+    lowercase `name_index` whose people are listed by graph index in
+    `name_offsets` and `name_people`. Births, titles and years are left
+    out of memory and read on demand by `load_people` and `load_movies`.
+
+    If `source` is a fingerprint of the CSV files, the graph is cached
+    in a snapshot as for `load_data`.
+    """
+    global graph, name_index, name_offsets, name_people
+
+    path = os.path.join(directory, LEAN_SNAPSHOT)
+    if source is not None:
+        loaded = snapshot.read_snapshot(path, source)
+        if loaded is not None:
+            arrays, data = loaded
+            graph = StarGraph(
+                _snapshot_ids(arrays["person_ids"], data["person_ids"]),
+                _snapshot_ids(arrays["movie_ids"], data["movie_ids"]),
+                arrays["person_offsets"], arrays["person_movies"],
+                arrays["movie_offsets"], arrays["movie_stars"]
+            )
+            name_index = NameIndex(*data["name_index"])
+            name_offsets = arrays["name_offsets"]
+            name_people = arrays["name_people"]
+            return
+
+    person_ids = _stream_ids(f"{directory}/people.csv", "id")
+    movie_ids = _stream_ids(f"{directory}/movies.csv", "id")
+    person_index = index_ids(person_ids)
+    movie_index = index_ids(movie_ids)
+
+    edge_people = array("i")
+    edge_movies = array("i")
+    for person_id, movie_id in _stream_columns(
+        f"{directory}/stars.csv", "person_id", "movie_id"
+    ):
+        try:
+            person = person_index[person_id]
+            movie = movie_index[movie_id]
+        except KeyError:
+            continue
+        edge_people.append(person)
+        edge_movies.append(movie)
+    graph = StarGraph.from_edges(
+        person_ids, movie_ids, edge_people, edge_movies
+    )
+    del edge_people, edge_movies
+
+    groups = {}
+    for person_id, name in _stream_columns(
+        f"{directory}/people.csv", "id", "name"
+    ):
+        groups.setdefault(name.lower(), set()).add(person_index[person_id])
+    name_index = NameIndex.build(groups)
+    name_offsets = array("i", [0])
+    name_people = array("i")
+    for key in name_index.keys:
+        name_people.extend(sorted(groups[key]))
+        name_offsets.append(len(name_people))
+    del groups
+
+    if source is not None:
+        arrays = {
+            "person_offsets": graph.person_offsets,
+            "person_movies": graph.person_movies,
+            "movie_offsets": graph.movie_offsets,
+            "movie_stars": graph.movie_stars,
+            "name_offsets": name_offsets,
+            "name_people": name_people,
+        }
+        data = {
+            "name_index": (name_index.keys, name_index.reversed_keys),
+        }
+        for name, ids in (("person_ids", person_ids),
+                          ("movie_ids", movie_ids)):
+            if isinstance(ids, SortedIds):
+                arrays[name] = ids.values
+                data[name] = None
+            else:
+                arrays[name] = array("i")
+                data[name] = ids
+        try:
+            snapshot.write_snapshot(path, source, arrays, data)
+        except OSError:
+            pass
+
+
+def load_people(person_ids):
+    """
+    Make sure `people` has entries for each of `person_ids`, reading
+    them from people.csv if only the graph was loaded.
+    """
+    wanted = set(person_ids) - people.keys()
+    if not wanted or not lean:
+        return
+    for row in _stream_columns(f"{data_directory}/people.csv",
+                               "id", "name", "birth"):
+        if row[0] in wanted:
+            people[row[0]] = {"name": row[1], "birth": row[2]}
+
+
+def load_movies(movie_ids):
+    """
+    Make sure `movies` has entries for each of `movie_ids`, reading
+    them from movies.csv if only the graph was loaded.
+    """
+    wanted = set(movie_ids) - movies.keys()
+    if not wanted or not lean:
+        return
+    for row in _stream_columns(f"{data_directory}/movies.csv",
+                               "id", "title", "year"):
+        if row[0] in wanted:
+            movies[row[0]] = {"title": row[1], "year": row[2]}
+
+
+def ids_for_name(name):
+    """
+    Returns the set of person_ids with the given name. If only the graph
+    was loaded, they are looked up in `name_index` and `name_people`.
+    """
+    key = name.lower()
+    if not lean:
+        return names.get(key, set())
+    keys = name_index.keys
+    k = bisect_left(keys, key)
+    if k == len(keys) or keys[k] != key:
+        return set()
+    return {
+        graph.person_ids[i]
+        for i in name_people[name_offsets[k]:name_offsets[k + 1]]
+    }
+
+
+def _csv_paths(directory):
+    return [
+        os.path.join(directory, f"{name}.csv")
+        for name in ("people", "movies", "stars")
+    ]
+
+
+def _stream_columns(filename, *columns):
+    """
+    Yields a tuple of the named `columns` for each row of a CSV file,
+    without building a dict per row.
+    """
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [header.index(column) for column in columns]
+        for row in reader:
+            yield tuple(row[i] for i in positions)
+
+
+def _stream_ids(filename, column):
+    """
+    Returns the ids in `column` of a CSV file as SortedIds, or as a list
+    of strings if they are not all small decimal integers.
+    """
+    ids = SortedIds.from_strings(
+        row[0] for row in _stream_columns(filename, column)
+    )
+    if ids is None:
+        ids = list(dict.fromkeys(
+            row[0] for row in _stream_columns(filename, column)
+        ))
+    return ids
+
+
+def _snapshot_ids(values, ids):
+    return SortedIds(values) if ids is None else ids
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "small"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [directory] [options]"
+    )
+    parser.add_argument("directory", nargs="?", default="small")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always parse the CSV files")
+    parser.add_argument("--lean", action="store_true",
+                        help="load only the graph and names, reading the rest "
+                             "on demand")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", metavar="FILE",
+                      help="answer tab-separated name pairs from FILE "
+                           "(- for stdin) as JSON lines")
+    mode.add_argument("--serve", metavar="PORT", type=int,
+                      help="answer queries over HTTP on PORT")
+    args = parser.parse_args()
+    directory = args.directory
+    search = shortest_path_bidirectional if args.bidirectional \
+        else shortest_path
+
+    # Load data from files into memory, keeping stdout for results
+    log = sys.stdout if args.batch is None else sys.stderr
+    print("Loading data...", file=log)
+    load_data(directory, cache=not args.no_cache, lean_load=args.lean)
+    print("Data loaded.", file=log)
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    if args.batch is not None:
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, search)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, sys.stdout, search)
+        return
+    if args.serve is not None:
+        serve(args.serve, search)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -73,7 +370,7 @@ def main():
     if target is None:
        sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = search(source, target)
 
     if path is None:
         print("Not connected.")
@@ -81,6 +378,8 @@ def main():
         degrees = len(path)
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
+        load_people(person_id for _, person_id in path)
+        load_movies(movie_id for movie_id, _ in path[1:])
         for i in range(degrees):
             person1 = people[path[i][1]]["name"]
             person2 = people[path[i + 1][1]]["name"]
@@ -88,35 +387,137 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def run_batch(lines, output, search=None):
+    """
+    Answer one query per line of `lines`, each a source name and a target
+    name separated by a tab, writing one JSON object per line to `output`.
+    A line that is not two non-empty names gets a "malformed line" error.
+    Lines are answered as they arrive, so `lines` may be a live stream.
+    Throughput is reported on stderr at the end.
+    """
+    count = 0
+    start = time.perf_counter()
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        names = line.split("\t")
+        if len(names) != 2 or not all(name.strip() for name in names):
+            result = {"error": "malformed line", "line": line}
+        else:
+            result = answer_query(*names, search)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        count += 1
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"{count} queries in {elapsed:.2f} s ({rate:.1f} queries/sec)",
+          file=sys.stderr)
+
+
+def serve(port, search=None):
+    """
+    Answer queries over HTTP on localhost until interrupted.
+    GET /?source=NAME&target=NAME responds with the JSON object
+    produced by `answer_query`.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            if "source" not in query or "target" not in query:
+                self.send_error(400, "source and target are required")
+                return
+            result = answer_query(
+                query["source"][0], query["target"][0], search
+            )
+            body = json.dumps(result).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Serving on http://127.0.0.1:{port}/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def answer_query(source_name, target_name, search=None):
+    """
+    Returns a JSON-serializable dict answering a query between two names,
+    without prompting: names that match no one, or more than one person,
+    are reported as errors along with any candidate ids.
+    """
+    if search is None:
+        search = shortest_path
+    result = {"source": source_name, "target": target_name}
+    ids = []
+    for name in (source_name, target_name):
+        person_ids = sorted(ids_for_name(name))
+        if len(person_ids) != 1:
+            result["error"] = ("person not found" if not person_ids
+                               else "ambiguous name")
+            result["name"] = name
+            result["candidates"] = person_ids or search_people(name)
+            return result
+        ids.append(person_ids[0])
+
+    stats = {}
+    path = search(ids[0], ids[1], stats=stats)
+    result["stats"] = stats
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie_id": movie_id, "person_id": person_id}
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
     If no possible path, returns None.
+
+    If `stats` is a dict, the cost of the search is stored in it:
+    "num_explored" people expanded, "peak_frontier" size, and
+    "duplicates_suppressed" neighbors skipped as already discovered.
     """
+    if source == target:
+        _record_stats(stats, 0, 0, 0)
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
     num_explored = 0
+    peak_frontier = 1
+    duplicates = 0
     start = Node(state=source, parent=None, action=None)
     queue = QueueFrontier()
     queue.add(start)
 
-    # Set of explored actors
-    explored = set()
-    
-    while True:
-        if queue.empty():
-            return None
-
-        node = queue.remove()
-        num_explored += 1
-        # Mark node as explored.
-        explored.add(node.state)
-        # Find neighbors of the node.
-        neighbors = neighbors_for_person(node.state)    # set = {(movie1, person1), (movie2, person2)}
-        #print(neighbors)
-        for movie, person in neighbors:
-            if person not in explored and not queue.contains_state(node):
+    # People are marked when first discovered, so each is enqueued once
+    discovered = {source}
+
+    try:
+        while not queue.empty():
+            node = queue.remove()
+            num_explored += 1
+            for movie, person in graph.neighbors(node.state):
+                if person in discovered:
+                    duplicates += 1
+                    continue
+                discovered.add(person)
                 child = Node(state=person, parent=node, action=movie)
-                if child.state == target:
+                if person == target:
                     # return a tuple of (movie_id, person_id)
                     path = []
                     node = child
@@ -124,9 +525,238 @@ def shortest_path(source, target):
                         path.append((node.action, node.state))
                         node = node.parent
                     path.reverse()
-                    return path
+                    return _path_ids(path)
 
                 queue.add(child)
+            peak_frontier = max(peak_frontier, len(queue.frontier))
+        return None
+    finally:
+        _record_stats(stats, num_explored, peak_frontier, duplicates)
+
+
+def shortest_path_bidirectional(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching outwards from
+    both people at once and always expanding the smaller frontier.
+    If no possible path, returns None.
+
+    If `stats` is a dict, the cost of the search is stored in it as for
+    `shortest_path`, with "peak_frontier" counting both frontiers.
+    """
+    if source == target:
+        _record_stats(stats, 0, 0, 0)
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+
+    # Maps each reached person to the (movie, person) it was reached
+    # through, for the search from the source and from the target.
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    num_explored = 0
+    peak_frontier = 2
+    duplicates = 0
+
+    try:
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                frontier, reached, other = \
+                    forward_frontier, forward, backward
+                waiting = len(backward_frontier)
+            else:
+                frontier, reached, other = \
+                    backward_frontier, backward, forward
+                waiting = len(forward_frontier)
+
+            # Expand a whole layer so the best meeting point can be chosen
+            next_frontier = []
+            meeting = None
+            for person in frontier:
+                num_explored += 1
+                for movie, neighbor in graph.neighbors(person):
+                    if neighbor in reached:
+                        duplicates += 1
+                        continue
+                    reached[neighbor] = (movie, person)
+                    if neighbor in other:
+                        length = _path_length(forward, neighbor) + \
+                            _path_length(backward, neighbor)
+                        if meeting is None or length < meeting[0]:
+                            meeting = (length, neighbor)
+                    next_frontier.append(neighbor)
+            peak_frontier = max(peak_frontier, len(next_frontier) + waiting)
+
+            if meeting is not None:
+                return _path_ids(_join_paths(forward, backward, meeting[1]))
+
+            if reached is forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+        return None
+    finally:
+        _record_stats(stats, num_explored, peak_frontier, duplicates)
+
+
+def _record_stats(stats, num_explored, peak_frontier, duplicates):
+    """
+    Stores search counters in `stats`, if it is a dict.
+    """
+    if stats is not None:
+        stats["num_explored"] = num_explored
+        stats["peak_frontier"] = peak_frontier
+        stats["duplicates_suppressed"] = duplicates
+
+
+def _path_length(reached, person):
+    """
+    Returns the number of steps from the root of a search to `person`.
+    """
+    length = 0
+    while reached[person] is not None:
+        person = reached[person][1]
+        length += 1
+    return length
+
+
+def _join_paths(forward, backward, meeting):
+    """
+    Returns the (movie, person) path through `meeting`, given the
+    parent links of a search from the source and one from the target.
+    """
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, parent = backward[person]
+        path.append((movie, parent))
+        person = parent
+    return path
+
+
+def _path_ids(path):
+    """
+    Converts a path of (movie, person) graph indices into
+    (movie_id, person_id) pairs.
+    """
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
+
+
+def single_source(source):
+    """
+    Runs one breadth-first search from person index `source` over the
+    whole graph, expanding each movie only once.
+
+    Returns (distances, parents, via) arrays indexed by person index:
+    the degrees of separation from the source (-1 if unreachable), the
+    person each was reached from, and the movie connecting them
+    (both -1 for the source and for unreachable people).
+    """
+    num_people = graph.num_people()
+    distances = array("i", [-1]) * num_people
+    parents = array("i", [-1]) * num_people
+    via = array("i", [-1]) * num_people
+    seen_movies = bytearray(len(graph.movie_ids))
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for person in frontier:
+            for movie in graph.movies_for(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for i in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    star = movie_stars[i]
+                    if distances[star] == -1:
+                        distances[star] = depth
+                        parents[star] = person
+                        via[star] = movie
+                        next_frontier.append(star)
+        frontier = next_frontier
+    return distances, parents, via
+
+
+def path_from_parents(distances, parents, via, target):
+    """
+    Returns the (movie_id, person_id) path to person index `target`
+    from the arrays returned by `single_source`, or None if the target
+    was not reached.
+    """
+    if distances[target] == -1:
+        return None
+    path = []
+    person = target
+    while parents[person] != -1:
+        path.append((via[person], person))
+        person = parents[person]
+    path.reverse()
+    return _path_ids(path)
+
+
+def distance_matrix(sources, targets=None, workers=None):
+    """
+    Returns the degrees of separation from each person id in `sources`
+    to each person id in `targets` (default: everyone, in graph index
+    order) as a flat row-major array of 32-bit integers, with -1 for
+    people who are not connected.
+
+    Sources are searched in a pool of `workers` processes (default: one
+    per CPU), each sharing the loaded graph.
+    """
+    sources = [graph.person_index[source] for source in sources]
+    if targets is not None:
+        targets = array("i", [graph.person_index[t] for t in targets])
+
+    if workers == 1 or len(sources) <= 1:
+        rows = [_distance_row(source, targets) for source in sources]
+    else:
+        with multiprocessing.Pool(
+            workers, initializer=_init_worker,
+            initargs=(data_directory, lean)
+        ) as pool:
+            rows = pool.starmap(
+                _distance_row, [(source, targets) for source in sources]
+            )
+
+    result = array("i")
+    for row in rows:
+        result.extend(row)
+    return result
+
+
+def _init_worker(directory, lean_load):
+    """
+    Makes the graph available in a pool worker. Forked workers inherit
+    it; others load it, which maps the same snapshot if one exists.
+    """
+    if graph is None:
+        load_data(directory, lean_load=lean_load)
+
+
+def _distance_row(source, targets):
+    distances, _, _ = single_source(source)
+    if targets is None:
+        return distances
+    return array("i", [distances[target] for target in targets])
 
 
 def person_id_for_name(name):
@@ -134,10 +764,11 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = list(ids_for_name(name))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        load_people(person_ids)
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -155,16 +786,28 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def search_people(name, limit=10, max_distance=1):
+    """
+    Returns up to `limit` person ids whose names match `name` exactly,
+    start with it, or are within `max_distance` edits of it, best
+    matches first. Never prompts.
+    """
+    if name_index is None:
+        return []
+    person_ids = []
+    for key, _ in name_index.search(name, limit, max_distance):
+        person_ids.extend(sorted(ids_for_name(key)))
+    return person_ids[:limit]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index[person_id]):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
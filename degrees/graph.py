@@ -0,0 +1,166 @@
+from array import array
+from bisect import bisect_left
+
+
+class StarGraph():
+    """
+    Bipartite graph of people and the movies they starred in.
+
+    Person and movie ids are interned to dense integers, and adjacency is
+    stored in CSR form: the movies of person `i` are
+    `person_movies[person_offsets[i]:person_offsets[i + 1]]`, and the
+    stars of movie `j` are `movie_stars[movie_offsets[j]:movie_offsets[j + 1]]`.
+    """
+
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies, movie_offsets, movie_stars):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_index = index_ids(person_ids)
+        self.movie_index = index_ids(movie_ids)
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edge_people, edge_movies):
+        """
+        Build a graph from parallel arrays of person and movie indices,
+        one entry per starring role. Duplicate roles are dropped.
+        """
+        person_offsets, person_movies = _compress(
+            len(person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_stars = _compress(
+            len(movie_ids), edge_movies, edge_people
+        )
+        return cls(person_ids, movie_ids,
+                   person_offsets, person_movies, movie_offsets, movie_stars)
+
+    def num_people(self):
+        return len(self.person_ids)
+
+    def movies_for(self, person):
+        """Returns the movie indices of person index `person`."""
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_for(self, movie):
+        """Returns the person indices of movie index `movie`."""
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with person index `person`.
+        """
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for movie in self.movies_for(person):
+            for i in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[i]
+
+
+class SortedIds():
+    """
+    Sequence of decimal string ids held as a sorted array of 32-bit
+    integers, a fraction of the size of a list of strings plus a dict
+    mapping them back to indices.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    @classmethod
+    def from_strings(cls, ids):
+        """
+        Returns SortedIds holding `ids`, or None if any id is not a
+        canonical decimal integer that fits in 32 bits.
+        """
+        values = array("i")
+        try:
+            for id in ids:
+                value = int(id)
+                if str(value) != id:
+                    return None
+                values.append(value)
+        except (ValueError, OverflowError):
+            return None
+        return cls(array("i", sorted(set(values))))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return str(self.values[i])
+
+    def __iter__(self):
+        return (str(value) for value in self.values)
+
+    def position(self, id):
+        """Returns the index of `id`, raising KeyError if it is absent."""
+        try:
+            value = int(id)
+        except ValueError:
+            raise KeyError(id)
+        i = bisect_left(self.values, value)
+        if i == len(self.values) or self.values[i] != value:
+            raise KeyError(id)
+        return i
+
+
+class _Positions():
+    """Read-only mapping from the ids in a SortedIds to their indices."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __getitem__(self, id):
+        return self.ids.position(id)
+
+    def __contains__(self, id):
+        try:
+            self.ids.position(id)
+        except KeyError:
+            return False
+        return True
+
+
+def index_ids(ids):
+    """Returns a mapping from each id in `ids` to its index."""
+    if isinstance(ids, SortedIds):
+        return _Positions(ids)
+    return {id: i for i, id in enumerate(ids)}
+
+
+def _compress(num_rows, rows, columns):
+    """
+    Returns CSR (offsets, indices) arrays for the pairs in parallel
+    arrays `rows` and `columns`, with each row sorted and deduplicated.
+    """
+    counts = array("i", bytes(4 * (num_rows + 1)))
+    for row in rows:
+        counts[row + 1] += 1
+    for i in range(num_rows):
+        counts[i + 1] += counts[i]
+
+    indices = array("i", bytes(4 * len(rows)))
+    cursor = counts[:-1]
+    for row, column in zip(rows, columns):
+        indices[cursor[row]] = column
+        cursor[row] += 1
+
+    # Sort and deduplicate each row in place, compacting as we go
+    offsets = array("i", [0])
+    end = 0
+    for i in range(num_rows):
+        row = sorted(set(indices[counts[i]:counts[i + 1]]))
+        indices[end:end + len(row)] = array("i", row)
+        end += len(row)
+        offsets.append(end)
+    del indices[end:]
+    return offsets, indices
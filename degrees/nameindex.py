@@ -0,0 +1,115 @@
+from bisect import bisect_left
+
+
+class NameIndex():
+    """
+    Sorted index of lowercase names supporting prefix and typo-tolerant
+    lookups.
+
+    Names are kept sorted both as written and reversed. Any single edit
+    leaves either the first or the second half of a name intact, so
+    candidates for a misspelled query are found by a prefix range scan
+    over the first array and a suffix range scan over the second.
+    """
+
+    def __init__(self, keys, reversed_keys):
+        self.keys = keys
+        self.reversed_keys = reversed_keys
+
+    @classmethod
+    def build(cls, names):
+        """Build an index over the lowercase names in `names`."""
+        keys = sorted(names)
+        reversed_keys = sorted(key[::-1] for key in keys)
+        return cls(keys, reversed_keys)
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`,
+        in alphabetical order.
+        """
+        return _range(self.keys, prefix.lower(), limit)
+
+    def search(self, query, limit=10, max_distance=1, scan=2000):
+        """
+        Returns up to `limit` (name, distance) pairs ranked by how well
+        they match `query`: an exact match, then names the query is a
+        prefix of, then names within `max_distance` edits. The distance
+        is the number of edits between the query and the name.
+
+        At most `scan` names the query is a prefix of are examined. If
+        `max_distance` is at most 1, every name sharing the first or
+        second half of the query is examined, so that all matches within
+        one edit are found; larger distances are best effort, examining
+        at most `scan` names for each half.
+        """
+        query = query.lower()
+        ranked = {}
+
+        for key in _range(self.keys, query, scan):
+            distance = len(key) - len(query)
+            ranked[key] = (min(distance, 1), distance, key)
+
+        half = len(query) // 2
+        limit = None if max_distance <= 1 else scan
+        candidates = set(_range(self.keys, query[:half], limit))
+        candidates.update(
+            key[::-1]
+            for key in _range(self.reversed_keys,
+                              query[half:][::-1], limit)
+        )
+        for key in candidates:
+            if key in ranked or abs(len(key) - len(query)) > max_distance:
+                continue
+            distance = edit_distance(query, key, max_distance)
+            if distance <= max_distance:
+                ranked[key] = (2, distance, key)
+
+        best = sorted(ranked.values())[:limit]
+        return [(key, distance) for _, distance, key in best]
+
+
+def edit_distance(a, b, bound):
+    """
+    Returns the Levenshtein distance between `a` and `b`, or any value
+    greater than `bound` once the distance is known to exceed it.
+    Only cells within `bound` of the diagonal are computed.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    over = bound + 1
+    previous = [j if j <= bound else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char = a[i - 1]
+        low = max(1, i - bound)
+        high = min(len(b), i + bound)
+        current = [over] * (len(b) + 1)
+        if i <= bound:
+            current[0] = i
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != b[j - 1]),
+                over
+            )
+        if min(current[low - 1:high + 1]) > bound:
+            return over
+        previous = current
+    return previous[-1]
+
+
+def _range(keys, prefix, limit=None):
+    """
+    Returns the sorted `keys` starting with `prefix`, or only the first
+    `limit` of them if `limit` is not None.
+    """
+    start = bisect_left(keys, prefix)
+    end = len(keys) if limit is None else min(len(keys), start + limit)
+    result = []
+    for i in range(start, end):
+        key = keys[i]
+        if not key.startswith(prefix):
+            break
+        result.append(key)
+    return result
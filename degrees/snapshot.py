@@ -0,0 +1,108 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 3
+
+# magic, version, header length
+PREAMBLE = struct.Struct("<8sII")
+
+
+def fingerprint(paths):
+    """
+    Returns a list identifying the current contents of the files at
+    `paths` by their size and modification time.
+    """
+    result = []
+    for path in paths:
+        info = os.stat(path)
+        result.append([os.path.basename(path), info.st_size, info.st_mtime_ns])
+    return result
+
+
+def write_snapshot(path, source, arrays, data):
+    """
+    Write a snapshot to `path`.
+
+    `source` is the fingerprint of the files the snapshot was built from,
+    `arrays` maps names to int32 arrays that are memory-mapped back on
+    load, and `data` is any other picklable object.
+    The file is written to a temporary name and moved into place, so a
+    reader never sees a partial snapshot.
+    """
+    blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    header = {
+        "source": source,
+        "byteorder": sys.byteorder,
+        "arrays": [[name, len(values)] for name, values in arrays.items()],
+        "data": len(blob),
+    }
+    header = json.dumps(header).encode("utf-8")
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        _pad(f)
+        for values in arrays.values():
+            if values.itemsize != 4:
+                raise ValueError("snapshot arrays must hold 32-bit integers")
+            f.write(values.tobytes())
+            _pad(f)
+        f.write(blob)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path, source):
+    """
+    Memory-map the snapshot at `path`.
+
+    Returns (arrays, data), with each array as an int32 memoryview over
+    the mapped file, or None if there is no snapshot, it was written by
+    a different version, or it was built from files other than `source`.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            return None
+        magic, version, header_length = PREAMBLE.unpack(preamble)
+        if magic != MAGIC or version != VERSION:
+            return None
+        try:
+            header = json.loads(f.read(header_length))
+        except ValueError:
+            return None
+        if (header["source"] != source
+                or header["byteorder"] != sys.byteorder):
+            return None
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    offset = _aligned(PREAMBLE.size + header_length)
+    arrays = {}
+    for name, length in header["arrays"]:
+        end = offset + 4 * length
+        if end > len(buffer):
+            return None
+        arrays[name] = buffer[offset:end].cast("i")
+        offset = _aligned(end)
+    try:
+        data = pickle.loads(buffer[offset:offset + header["data"]])
+    except (pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    return arrays, data
+
+
+def _aligned(offset):
+    return (offset + 7) // 8 * 8
+
+
+def _pad(f):
+    f.write(bytes(_aligned(f.tell()) - f.tell()))
@@ -0,0 +1,219 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import heredity
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python batch.py input [options]"
+    )
+    parser.add_argument("input",
+                        help="a CSV file, or a directory of CSV files")
+    parser.add_argument("--family-column", default="family",
+                        metavar="COLUMN",
+                        help="column naming each row's family, if present "
+                             "(default: family)")
+    parser.add_argument("--method",
+                        choices=[*heredity.METHODS, *heredity.SAMPLERS],
+                        default="elimination", help="inference method")
+    parser.add_argument("--samples", type=int, default=heredity.SAMPLES,
+                        help="number of samples for sampling methods")
+    parser.add_argument("--seed", type=int,
+                        help="seed for reproducible sampling")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes solving families")
+    parser.add_argument("--output", metavar="FILE", default="marginals.csv",
+                        help="write marginals to FILE, as JSON if it ends "
+                             "in .json and as CSV otherwise")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        families = load_families(args.input, args.family_column)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot read families: {e}")
+    options = {
+        "method": args.method,
+        "samples": args.samples,
+        "seed": args.seed,
+    }
+    results = solve_families(families, options, args.workers)
+    if args.output.endswith(".json"):
+        write_json(args.output, results)
+    else:
+        write_csv(args.output, results)
+    elapsed = time.perf_counter() - start
+
+    solved = sum(1 for _, probabilities, _ in results if probabilities)
+    people = sum(len(probabilities) for _, probabilities, _ in results
+                 if probabilities)
+    rate = len(results) / elapsed if elapsed > 0 else 0
+    print(f"{solved} of {len(results)} families ({people} people) solved "
+          f"in {elapsed:.2f} s ({rate:.1f} families/sec)", file=sys.stderr)
+    for family, _, error in results:
+        if error:
+            print(f"  {family}: {error}", file=sys.stderr)
+    print(f"Marginals written to {args.output}", file=sys.stderr)
+
+
+def load_families(path, family_column="family"):
+    """
+    Return a list of (family id, people) pairs of independent families
+    read from the CSV file at `path`, or from each CSV file in the
+    directory at `path`.
+
+    Rows are grouped by `family_column` if a file has it, and each group
+    is split into the connected components of its mother and father
+    links. A family is identified by its file name, its family column
+    and, if a group holds several unrelated families, their number
+    within it, separated by "/".
+    """
+    if os.path.isdir(path):
+        filenames = sorted(
+            os.path.join(path, filename) for filename in os.listdir(path)
+            if filename.endswith(".csv")
+        )
+    else:
+        filenames = [path]
+
+    families = []
+    for filename in filenames:
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        groups = {}
+        with open(filename) as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                group = row.get(family_column)
+                people = groups.setdefault(group, {})
+                if row["name"] in people:
+                    raise ValueError(
+                        f"{filename}: {row['name']!r} appears twice"
+                    )
+                people[row["name"]] = heredity.person_from_row(row)
+
+        for group, people in groups.items():
+            family = stem if group is None else f"{stem}/{group}"
+            parts = components(people)
+            if len(parts) == 1:
+                families.append((family, parts[0]))
+            else:
+                families.extend(
+                    (f"{family}/{k}", part)
+                    for k, part in enumerate(parts, 1)
+                )
+    return families
+
+
+def components(people):
+    """
+    Return the connected components of `people` linked by mother and
+    father, each as a dictionary like `people`, in order of their first
+    person.
+    """
+    roots = {name: name for name in people}
+
+    def find(name):
+        while roots[name] != name:
+            roots[name] = roots[roots[name]]
+            name = roots[name]
+        return name
+
+    for name, person in people.items():
+        for parent in (person["mother"], person["father"]):
+            if parent is None:
+                continue
+            if parent not in people:
+                raise ValueError(f"parent {parent!r} of {name!r} is unknown")
+            roots[find(parent)] = find(name)
+
+    parts = {}
+    for name, person in people.items():
+        parts.setdefault(find(name), {})[name] = person
+    return list(parts.values())
+
+
+def solve_families(families, options, workers=1):
+    """
+    Return a (family id, probabilities, error) triple for each of the
+    `families`, solved with `options` in a pool of `workers` processes.
+    A family that cannot be solved has probabilities None and the reason
+    as its error.
+    """
+    tasks = [(family, people, options) for family, people in families]
+    if workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(workers) as pool:
+            chunksize = max(1, len(tasks) // (4 * workers))
+            return pool.starmap(solve_family, tasks, chunksize)
+    return [solve_family(*task) for task in tasks]
+
+
+def solve_family(family, people, options):
+    """
+    Return a (family id, probabilities, error) triple for one family.
+    Any error solving it is returned rather than raised, so that one
+    bad pedigree does not stop the rest of a batch.
+    """
+    method = options["method"]
+    try:
+        if method in heredity.SAMPLERS:
+            probabilities = heredity.sample_probabilities(
+                people, method, options["samples"], seed=options["seed"]
+            )
+        else:
+            probabilities = heredity.METHODS[method](people)
+    except Exception as e:
+        return family, None, str(e) or type(e).__name__
+    return family, probabilities, None
+
+
+def write_csv(filename, results):
+    """
+    Write one row per person with their family, name, probability of
+    each gene count and probability of the trait.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["family", "name", "gene_0", "gene_1", "gene_2",
+                         "trait"])
+        for family, probabilities, _ in results:
+            for name, person in (probabilities or {}).items():
+                writer.writerow([
+                    family, name,
+                    *(f"{person['gene'][count]:.6f}" for count in range(3)),
+                    f"{person['trait'][True]:.6f}"
+                ])
+
+
+def write_json(filename, results):
+    """
+    Write an object mapping each family id to an object giving each
+    person's gene distribution and probability of the trait, or to the
+    error if the family was not solved.
+    """
+    report = {}
+    for family, probabilities, error in results:
+        if error:
+            report[family] = {"error": error}
+        else:
+            report[family] = {
+                name: {
+                    "gene": {
+                        str(count): person["gene"][count]
+                        for count in range(3)
+                    },
+                    "trait": person["trait"][True],
+                }
+                for name, person in probabilities.items()
+            }
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
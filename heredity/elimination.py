@@ -0,0 +1,260 @@
+import heapq
+
+# Largest table of a cluster of variables that marginals will build
+MAX_TABLE_SIZE = 10 ** 7
+
+# Variables with more neighbours than this are scored by the most fill
+# edges they could add rather than by counting them
+MAX_FILL_DEGREE = 64
+
+
+class Factor():
+    """
+    Table of non-negative values over every assignment to a tuple of
+    discrete variables, the `k`th of which takes values
+    `0 .. cards[k] - 1`. Values are stored in row-major order, so the
+    first variable changes slowest.
+    """
+
+    def __init__(self, variables, cards, values):
+        self.variables = tuple(variables)
+        self.cards = tuple(cards)
+        self.values = values
+
+    @classmethod
+    def ones(cls, variables, cards):
+        size = 1
+        for card in cards:
+            size *= card
+        return cls(variables, cards, [1.0] * size)
+
+    def __mul__(self, other):
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        cards = self.cards + tuple(
+            card for v, card in zip(other.variables, other.cards)
+            if v not in self.variables
+        )
+        left = _indices(cards, self._strides(variables))
+        right = _indices(cards, other._strides(variables))
+        a = self.values
+        b = other.values
+        return Factor(variables, cards,
+                      [a[i] * b[j] for i, j in zip(left, right)])
+
+    def marginal(self, keep):
+        """
+        Return the factor over the variables of `keep` in this factor,
+        summing out all the others.
+        """
+        kept = [v for v in self.variables if v in keep]
+        cards = [
+            card for v, card in zip(self.variables, self.cards) if v in keep
+        ]
+        result = Factor.ones(kept, cards)
+        total = [0.0] * len(result.values)
+        for i, value in zip(
+            _indices(self.cards, result._strides(self.variables)),
+            self.values
+        ):
+            total[i] += value
+        result.values = total
+        return result
+
+    def normalized(self):
+        """Return the factor scaled so that its values sum to 1."""
+        total = sum(self.values)
+        return Factor(self.variables, self.cards,
+                      [value / total for value in self.values])
+
+    def rescaled(self):
+        """
+        Return the factor scaled so that its largest value is 1, which
+        keeps long products of messages from underflowing.
+        """
+        top = max(self.values)
+        if top == 0:
+            return self
+        return Factor(self.variables, self.cards,
+                      [value / top for value in self.values])
+
+    def _strides(self, variables):
+        """
+        Return the step through this factor's values for each of
+        `variables`, which is 0 for variables it does not depend on.
+        """
+        strides = {}
+        step = 1
+        for v, card in zip(reversed(self.variables), reversed(self.cards)):
+            strides[v] = step
+            step *= card
+        return [strides.get(v, 0) for v in variables]
+
+
+def marginals(factors):
+    """
+    Return a dictionary mapping each variable of `factors` to its
+    marginal distribution, as a list of probabilities, under the
+    normalized product of the factors.
+
+    Variables are eliminated one at a time in a greedy min-fill order,
+    and the clusters of variables formed along the way are joined into
+    a junction tree. Passing messages up the tree and back down gives
+    every marginal at about twice the cost of eliminating once.
+
+    Raises ValueError if a cluster would need a table of more than
+    `MAX_TABLE_SIZE` values, as happens when the variables are too
+    densely interrelated for exact inference.
+    """
+    cards = {}
+    for factor in factors:
+        cards.update(zip(factor.variables, factor.cards))
+    order, clusters = _eliminate(factors)
+    position = {v: k for k, v in enumerate(order)}
+    for v, cluster in zip(order, clusters):
+        size = 1
+        for u in cluster:
+            size *= cards[u]
+        if size > MAX_TABLE_SIZE:
+            raise ValueError(
+                f"eliminating {v!r} needs a table of {size} values"
+            )
+
+    # Each cluster passes messages to the cluster of the first of its
+    # remaining variables to be eliminated
+    separators = [clusters[k] - {v} for k, v in enumerate(order)]
+    parents = [
+        position[min(separator, key=position.get)] if separator else None
+        for separator in separators
+    ]
+    children = [[] for _ in order]
+    for k, parent in enumerate(parents):
+        if parent is not None:
+            children[parent].append(k)
+
+    # Each factor belongs to the cluster of its first variable eliminated
+    potentials = []
+    for cluster in clusters:
+        variables = sorted(cluster, key=position.get)
+        potentials.append(
+            Factor.ones(variables, [cards[v] for v in variables])
+        )
+    for factor in factors:
+        if factor.variables:
+            k = min(position[v] for v in factor.variables)
+            potentials[k] = potentials[k] * factor
+
+    # Children are always eliminated before their parents. Products are
+    # rescaled as they grow, since a cluster may have hundreds of children
+    up = [None] * len(order)
+    for k in range(len(order)):
+        belief = potentials[k]
+        for child in children[k]:
+            belief = (belief * up[child]).rescaled()
+        up[k] = _message(belief, separators[k])
+
+    # The message down to each child combines the messages up from all
+    # its siblings, taken from running products before and after it
+    down = [None] * len(order)
+    result = {}
+    for k in reversed(range(len(order))):
+        belief = potentials[k]
+        if down[k] is not None:
+            belief = (belief * down[k]).rescaled()
+        before = [belief]
+        for child in children[k]:
+            before.append((before[-1] * up[child]).rescaled())
+        after = None
+        for i in reversed(range(len(children[k]))):
+            child = children[k][i]
+            message = before[i] if after is None \
+                else (before[i] * after).rescaled()
+            down[child] = _message(message, separators[child])
+            after = up[child] if after is None \
+                else (up[child] * after).rescaled()
+        result[order[k]] = _message(before[-1], {order[k]}).values
+    return result
+
+
+def _message(belief, keep):
+    """
+    Return the normalized marginal of `belief` over the variables of
+    `keep`, raising ValueError if the evidence makes it impossible.
+    """
+    message = belief.marginal(keep)
+    if sum(message.values) == 0:
+        raise ValueError("the known values have probability zero")
+    return message.normalized()
+
+
+def _eliminate(factors):
+    """
+    Return an elimination order for the variables of `factors`, chosen
+    greedily to add the fewest new edges between variables at each step,
+    and the cluster of variables each one is eliminated together with.
+
+    Scores are kept in a heap and recomputed only for the variables an
+    elimination can affect. Variables with more than `MAX_FILL_DEGREE`
+    neighbours are scored by the most edges they could add, which is
+    cheap to compute and puts them late in the order.
+    """
+    neighbors = {}
+    for factor in factors:
+        for v in factor.variables:
+            neighbors.setdefault(v, set()).update(factor.variables)
+    for v in neighbors:
+        neighbors[v].discard(v)
+    rank = {v: k for k, v in enumerate(neighbors)}
+
+    def key(v):
+        adjacent = neighbors[v]
+        degree = len(adjacent)
+        if degree > MAX_FILL_DEGREE:
+            return degree * (degree - 1) // 2, degree
+        adjacent = list(adjacent)
+        fill = sum(
+            1 for i, a in enumerate(adjacent) for b in adjacent[i + 1:]
+            if b not in neighbors[a]
+        )
+        return fill, degree
+
+    keys = {v: key(v) for v in neighbors}
+    heap = [(*keys[v], rank[v], v) for v in neighbors]
+    heapq.heapify(heap)
+    order = []
+    clusters = []
+    while heap:
+        score, degree, _, v = heapq.heappop(heap)
+        if keys.get(v) != (score, degree):
+            continue
+        del keys[v]
+        adjacent = neighbors.pop(v)
+        order.append(v)
+        clusters.append(adjacent | {v})
+        added = []
+        for u in adjacent:
+            neighbors[u].discard(v)
+            new = adjacent - neighbors[u] - {u}
+            added.extend((u, w) for w in new if rank[u] < rank[w])
+            neighbors[u].update(new)
+        # A score changes only if the variable lost v as a neighbour or
+        # is adjacent to both ends of a new edge
+        changed = set(adjacent)
+        for a, b in added:
+            changed.update(neighbors[a] & neighbors[b])
+        for u in changed:
+            keys[u] = key(u)
+            heapq.heappush(heap, (*keys[u], rank[u], u))
+    return order, clusters
+
+
+def _indices(cards, strides):
+    """
+    Return, for each assignment to variables with `cards` values in
+    row-major order, the sum of each value times its stride.
+    """
+    indices = [0]
+    for card, stride in zip(cards, strides):
+        indices = [i + a * stride for i in indices for a in range(card)]
+    return indices
@@ -1,6 +1,15 @@
+import argparse
 import csv
 import itertools
+import math
+import multiprocessing
+import random
 import sys
+import time
+from collections import deque
+from operator import add, getitem
+
+from elimination import Factor, marginals
 
 PROBS = {
 
@@ -36,16 +45,64 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Number of assignments evaluated together by JointEvaluator
+BATCH_SIZE = 4096
+
+# Sampling defaults: number of samples, independent batches they are
+# split into, Gibbs sweeps discarded at the start of each batch, and
+# segments of each batch used to estimate the effective sample size
+SAMPLES = 10000
+SAMPLE_BATCHES = 10
+BURN_IN = 100
+GIBBS_SEGMENTS = 10
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    parser = argparse.ArgumentParser(usage="python heredity.py data.csv")
+    parser.add_argument("data")
+    parser.add_argument("--method", choices=[*METHODS, *SAMPLERS],
+                        default="enumeration", help="inference method")
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help="number of samples for sampling methods")
+    parser.add_argument("--seed", type=int,
+                        help="seed for reproducible sampling")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of sampling processes")
+    args = parser.parse_args()
+    people = load_data(args.data)
+
+    try:
+        if args.method in SAMPLERS:
+            report = {}
+            probabilities = sample_probabilities(
+                people, args.method, args.samples, seed=args.seed,
+                workers=args.workers, report=report
+            )
+            print(f"{report['samples']} samples, effective sample size "
+                  f"{report['ess']:.0f}, {report['seconds']:.2f} s")
+        else:
+            probabilities = METHODS[args.method](people)
+    except ValueError as e:
+        sys.exit(f"Cannot use {args.method}: {e}")
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+def empty_probabilities(people):
+    """
+    Return a dictionary to keep track of gene and trait probabilities
+    for each person, with every probability 0.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,38 +117,525 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+def enumerate_probabilities(people):
+    """
+    Return the gene and trait distributions of each person in `people`,
+    by summing the joint probability of every assignment of genes and
+    traits consistent with the known traits.
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    Assignments are streamed from `assignments` and evaluated a batch at
+    a time, so memory use does not grow with their number.
+    """
+    probabilities = empty_probabilities(people)
+    evaluator = JointEvaluator(people)
+    stream = assignments(people, evaluator.names)
+    while batch := list(itertools.islice(stream, BATCH_SIZE)):
+        evaluator.update(probabilities, batch)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
+
+def assignments(people, names):
+    """
+    Yield every assignment of genes and traits to the people in `names`
+    that is consistent with the known traits, encoded as a pair of
+    tuples of gene counts and traits as `JointEvaluator` expects.
+
+    People whose trait is known keep it, so only the traits of the
+    others are enumerated, and they only take gene counts under which
+    their trait is possible.
+    """
+    known = [people[name]["trait"] for name in names]
+    unknown = [i for i, trait in enumerate(known) if trait is None]
+    genes = []
+    for trait in known:
+        genes.append([
+            count for count in range(3)
+            if trait is None or PROBS["trait"][count][trait] > 0
+        ])
+
+    traits = [int(bool(trait)) for trait in known]
+    for guess in itertools.product((0, 1), repeat=len(unknown)):
+        for i, value in zip(unknown, guess):
+            traits[i] = value
+        row = tuple(traits)
+        for counts in itertools.product(*genes):
+            yield counts, row
+
+
+def eliminate_probabilities(people):
+    """
+    Return the gene and trait distributions of each person in `people`
+    by exact inference in the pedigree as a Bayesian network: each
+    person's gene count depends on their parents', and known traits are
+    folded in as evidence on gene counts. Cost grows with the number of
+    people rather than exponentially, for pedigrees without many loops.
+    """
+    factors = [gene_factor(people, person) for person in people]
+    genes = marginals(factors)
+
+    probabilities = empty_probabilities(people)
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        for count in probabilities[person]["gene"]:
+            probabilities[person]["gene"][count] = genes[person][count]
+        trait = people[person]["trait"]
+        for value in probabilities[person]["trait"]:
+            if trait is not None:
+                p = 1 if value == trait else 0
+            else:
+                p = sum(
+                    genes[person][count] * PROBS["trait"][count][value]
+                    for count in PROBS["trait"]
+                )
+            probabilities[person]["trait"][value] = p
+    return probabilities
+
+
+def gene_factor(people, person):
+    """
+    Return a Factor over the number of copies of the gene `person` has,
+    and their parents' if known, giving the probability of their number
+    given their parents' times the probability of any known trait.
+    """
+    mother = people[person]["mother"]
+    father = people[person]["father"]
+    trait = people[person]["trait"]
+
+    def evidence(count):
+        if trait is None:
+            return 1
+        return PROBS["trait"][count][trait]
+
+    if mother is None and father is None:
+        return Factor([person], [3], [
+            PROBS["gene"][count] * evidence(count) for count in range(3)
+        ])
+
+    parents = [parent for parent in (mother, father) if parent is not None]
+    values = []
+    for count in range(3):
+        for parent_counts in itertools.product(range(3),
+                                               repeat=len(parents)):
+            passed = parents_passing(parent_counts)
+            values.append(
+                inheritance_probability(count, *passed) * evidence(count)
+            )
+    return Factor([person, *parents], [3] * (1 + len(parents)), values)
+
+
+def passing_probability(count):
+    """
+    Return the probability that a parent with `count` copies of the gene
+    passes one on to their child, as `joint_probability` computes it.
+    """
+    if count == 0:
+        return PROBS["mutation"]
+    if count == 1:
+        return (1 - PROBS["mutation"]) * 0.5
+    return 1 - PROBS["mutation"]
+
+
+def parents_passing(parent_counts):
+    """
+    Return the probabilities that the mother and father pass the gene
+    on, given the gene counts of the parents who are known. A parent who
+    is not known passes it on only by mutation.
+    """
+    passed = [passing_probability(count) for count in parent_counts]
+    return passed + [PROBS["mutation"]] * (2 - len(passed))
+
+
+def inheritance_probability(count, mother, father):
+    """
+    Return the probability that a child has `count` copies of the gene,
+    given the probabilities `mother` and `father` that each parent
+    passes one on.
+    """
+    if count == 0:
+        return (1 - mother) * (1 - father)
+    if count == 1:
+        return mother * (1 - father) + father * (1 - mother)
+    return mother * father
+
+
+def sample_probabilities(people, method="likelihood-weighting",
+                         samples=SAMPLES, seed=None, workers=1,
+                         batches=SAMPLE_BATCHES, report=None):
+    """
+    Return approximate gene and trait distributions of each person in
+    `people` from `samples` samples drawn by the named method in
+    `SAMPLERS`.
+
+    The samples are split into `batches` independent batches, each with
+    its own generator seeded from `seed`, and run across a pool of
+    `workers` processes, so the results depend only on `seed` and
+    `batches`. Trait distributions are averaged over each sample's
+    probability of the trait given its genes rather than sampled.
+
+    If `report` is a dict, the method, number of samples, effective
+    sample size and wall time in seconds are stored in it.
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"unknown sampling method {method!r}")
+    start = time.perf_counter()
+    pedigree = Pedigree(people)
+    batches = max(1, min(batches, samples))
+    master = random.Random(seed)
+    tasks = [
+        (method, samples // batches + (i < samples % batches),
+         master.getrandbits(64))
+        for i in range(batches)
+    ]
+
+    if workers > 1 and batches > 1:
+        with multiprocessing.Pool(
+            min(workers, batches), initializer=_init_pedigree,
+            initargs=(pedigree,)
+        ) as pool:
+            results = pool.starmap(_sample_task, tasks)
+    else:
+        _init_pedigree(pedigree)
+        results = [_sample_task(*task) for task in tasks]
+
+    genes, traits, ess = SAMPLERS[method][1](pedigree, results)
+    probabilities = empty_probabilities(people)
+    for i, person in enumerate(pedigree.names):
+        for count in probabilities[person]["gene"]:
+            probabilities[person]["gene"][count] = genes[i][count]
+        trait = people[person]["trait"]
+        for value in probabilities[person]["trait"]:
+            if trait is not None:
+                p = 1 if value == trait else 0
+            else:
+                p = traits[i] if value else 1 - traits[i]
+            probabilities[person]["trait"][value] = p
+
+    if report is not None:
+        report["method"] = method
+        report["samples"] = samples
+        report["ess"] = ess
+        report["seconds"] = time.perf_counter() - start
+    return probabilities
+
+
+class Pedigree():
+    """
+    The heredity model for `people` compiled for sampling.
+
+    People are numbered in an order in which parents come before their
+    children. Gene counts are kept in a list with one extra entry, fixed
+    at 0, which stands for any parent who is not known, as a parent
+    without the gene passes it on only by mutation.
+    """
+
+    def __init__(self, people):
+        self.names = _parents_first(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.mothers = []
+        self.fathers = []
+        self.children = [[] for _ in range(n)]
+        self.evidence = []
+        for i, name in enumerate(self.names):
+            mother = people[name]["mother"]
+            father = people[name]["father"]
+            self.mothers.append(index[mother] if mother is not None else n)
+            self.fathers.append(index[father] if father is not None else n)
+            if mother is not None:
+                self.children[index[mother]].append(i)
+            if father is not None and father != mother:
+                self.children[index[father]].append(i)
+            trait = people[name]["trait"]
+            self.evidence.append([
+                1 if trait is None else PROBS["trait"][count][trait]
+                for count in range(3)
+            ])
+        self.founders = [
+            people[name]["mother"] is None and people[name]["father"] is None
+            for name in self.names
+        ]
+        self.prior = [PROBS["gene"][count] for count in range(3)]
+
+        # Distribution of a child's gene count given their parents'
+        self.inheritance = [
+            [
+                [
+                    inheritance_probability(
+                        count, *parents_passing((mother, father))
+                    )
+                    for count in range(3)
+                ]
+                for father in range(3)
+            ]
+            for mother in range(3)
+        ]
+        self.trait = [PROBS["trait"][count][True] for count in range(3)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def distribution(self, i, genes):
+        """
+        Return the distribution of person `i`'s gene count given the
+        gene counts of their parents in `genes`.
+        """
+        if self.founders[i]:
+            return self.prior
+        return self.inheritance[genes[self.mothers[i]]][genes[self.fathers[i]]]
+
+    def forward(self, rng):
+        """
+        Return a list of gene counts sampled from the model ignoring
+        evidence, and the log of the probability of the evidence given
+        them.
+        """
+        genes = [0] * (len(self) + 1)
+        log_weight = 0.0
+        for i in range(len(self)):
+            count = _draw(self.distribution(i, genes), rng)
+            genes[i] = count
+            weight = self.evidence[i][count]
+            log_weight += math.log(weight) if weight > 0 else -math.inf
+        return genes, log_weight
+
+    def conditional(self, i, genes):
+        """
+        Return the unnormalized distribution of person `i`'s gene count
+        given everyone else's gene counts in `genes` and the evidence.
+        """
+        prior = self.distribution(i, genes)
+        evidence = self.evidence[i]
+        saved = genes[i]
+        weights = []
+        for count in range(3):
+            genes[i] = count
+            weight = prior[count] * evidence[count]
+            for child in self.children[i]:
+                weight *= self.distribution(child, genes)[genes[child]]
+            weights.append(weight)
+        genes[i] = saved
+        return weights
+
+
+def _parents_first(people):
+    """
+    Return the names in `people` ordered so that parents come before
+    their children, raising ValueError if someone is their own ancestor.
+    """
+    waiting = {}
+    children = {name: [] for name in people}
+    for name in people:
+        parents = {people[name]["mother"], people[name]["father"]} - {None}
+        waiting[name] = len(parents)
+        for parent in parents:
+            children[parent].append(name)
+
+    ready = deque(name for name in people if waiting[name] == 0)
+    order = []
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for child in children[name]:
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                ready.append(child)
+    if len(order) < len(people):
+        raise ValueError("someone in the family is their own ancestor")
+    return order
+
+
+def _draw(distribution, rng):
+    """Return a gene count drawn from an unnormalized `distribution`."""
+    u = rng.random() * (distribution[0] + distribution[1] + distribution[2])
+    if u < distribution[0]:
+        return 0
+    if u < distribution[0] + distribution[1]:
+        return 1
+    return 2
+
+
+# Pedigree used by _sample_task in this process
+_pedigree = None
+
+
+def _init_pedigree(pedigree):
+    global _pedigree
+    _pedigree = pedigree
+
+
+def _sample_task(method, n, seed):
+    return SAMPLERS[method][0](_pedigree, n, random.Random(seed))
+
+
+def _weighted_batch(pedigree, n, rng):
+    """
+    Draw `n` likelihood-weighted samples: gene counts are sampled from
+    the model ignoring evidence, and each sample is weighted by the
+    probability of the known traits given them.
+
+    Return the largest log weight, and the sums of the weights scaled by
+    it, of their squares, of the weights of each gene count of each
+    person, and of the weighted probability of each person's trait.
+    """
+    size = len(pedigree)
+    genes = [[0.0] * 3 for _ in range(size)]
+    traits = [0.0] * size
+    total = 0.0
+    squares = 0.0
+    top = -math.inf
+    trait = pedigree.trait
+    for _ in range(n):
+        sample, log_weight = pedigree.forward(rng)
+        if log_weight == -math.inf:
+            continue
+        if log_weight > top:
+            # Rescale the sums so far to the new largest weight
+            scale = math.exp(top - log_weight)
+            total *= scale
+            squares *= scale * scale
+            traits = [value * scale for value in traits]
+            genes = [[value * scale for value in row] for row in genes]
+            top = log_weight
+        weight = math.exp(log_weight - top)
+        total += weight
+        squares += weight * weight
+        for i in range(size):
+            count = sample[i]
+            genes[i][count] += weight
+            traits[i] += weight * trait[count]
+    return top, total, squares, genes, traits
+
+
+def _combine_weighted(pedigree, results):
+    """
+    Return the gene distributions, trait probabilities and effective
+    sample size from the results of `_weighted_batch`.
+    """
+    top = max(result[0] for result in results)
+    if top == -math.inf:
+        raise ValueError("no sample is consistent with the known traits")
+    size = len(pedigree)
+    genes = [[0.0] * 3 for _ in range(size)]
+    traits = [0.0] * size
+    total = 0.0
+    squares = 0.0
+    for batch_top, batch_total, batch_squares, batch_genes, batch_traits \
+            in results:
+        if batch_top == -math.inf:
+            continue
+        scale = math.exp(batch_top - top)
+        total += batch_total * scale
+        squares += batch_squares * scale * scale
+        for i in range(size):
+            traits[i] += batch_traits[i] * scale
+            for count in range(3):
+                genes[i][count] += batch_genes[i][count] * scale
+    return (
+        [[value / total for value in row] for row in genes],
+        [value / total for value in traits],
+        total * total / squares
+    )
+
+
+def _gibbs_batch(pedigree, n, rng):
+    """
+    Run a Gibbs sampler for `n` sweeps after `BURN_IN` sweeps, starting
+    from a forward sample, resampling each person's gene count given
+    everyone else's in turn.
+
+    Each person's conditional distribution is added to the estimates
+    rather than their sampled gene count. Return the number of sweeps,
+    the sums of the estimated gene distributions and trait probabilities
+    of each person, the sums of squares of their expected gene counts,
+    and the means of their expected gene counts in `GIBBS_SEGMENTS`
+    consecutive segments of the sweeps, from which the effective sample
+    size is estimated.
+    """
+    size = len(pedigree)
+    genes, _ = pedigree.forward(rng)
+    trait = pedigree.trait
+    sums = [[0.0] * 3 for _ in range(size)]
+    traits = [0.0] * size
+    squares = [0.0] * size
+    segments = []
+    length = max(1, n // GIBBS_SEGMENTS)
+    segment = [0.0] * size
+    for sweep in range(-BURN_IN, n):
+        for i in range(size):
+            weights = pedigree.conditional(i, genes)
+            total = weights[0] + weights[1] + weights[2]
+            if total == 0:
+                raise ValueError("no sample is consistent with the known "
+                                 "traits")
+            genes[i] = _draw(weights, rng)
+            if sweep < 0:
+                continue
+            p = [weight / total for weight in weights]
+            expected = p[1] + 2 * p[2]
+            row = sums[i]
+            row[0] += p[0]
+            row[1] += p[1]
+            row[2] += p[2]
+            traits[i] += p[0] * trait[0] + p[1] * trait[1] + p[2] * trait[2]
+            squares[i] += expected * expected
+            segment[i] += expected
+        if sweep >= 0 and (sweep + 1) % length == 0:
+            segments.append([value / length for value in segment])
+            segment = [0.0] * size
+    return n, sums, traits, squares, segments
+
+
+def _combine_gibbs(pedigree, results):
+    """
+    Return the gene distributions, trait probabilities and effective
+    sample size from the results of `_gibbs_batch`.
+
+    The effective sample size is the smallest over people whose gene
+    count varies of the sample variance of their expected gene count
+    divided by the variance of its mean estimated from segment means.
+    """
+    size = len(pedigree)
+    n = sum(result[0] for result in results)
+    if n == 0:
+        raise ValueError("no samples")
+    genes = [[0.0] * 3 for _ in range(size)]
+    traits = [0.0] * size
+    squares = [0.0] * size
+    segments = []
+    for _, batch_genes, batch_traits, batch_squares, batch_segments \
+            in results:
+        segments.extend(batch_segments)
+        for i in range(size):
+            traits[i] += batch_traits[i]
+            squares[i] += batch_squares[i]
+            for count in range(3):
+                genes[i][count] += batch_genes[i][count]
+
+    ess = n
+    for i in range(size):
+        mean = (genes[i][1] + 2 * genes[i][2]) / n
+        variance = squares[i] / n - mean * mean
+        if variance <= 1e-12 or len(segments) < 2:
+            continue
+        means = [segment[i] for segment in segments]
+        average = sum(means) / len(means)
+        spread = sum((x - average) ** 2 for x in means) / (len(means) - 1)
+        if spread > 0:
+            ess = min(ess, variance * len(means) / spread)
+    return (
+        [[value / n for value in row] for row in genes],
+        [value / n for value in traits],
+        ess
+    )
+
+
+SAMPLERS = {
+    "likelihood-weighting": (_weighted_batch, _combine_weighted),
+    "gibbs": (_gibbs_batch, _combine_gibbs),
+}
 
 
 def load_data(filename):
@@ -105,17 +649,23 @@ def load_data(filename):
     with open(filename) as f:
         reader = csv.DictReader(f)
         for row in reader:
-            name = row["name"]
-            data[name] = {
-                "name": name,
-                "mother": row["mother"] or None,
-                "father": row["father"] or None,
-                "trait": (True if row["trait"] == "1" else
-                          False if row["trait"] == "0" else None)
-            }
+            data[row["name"]] = person_from_row(row)
     return data
 
 
+def person_from_row(row):
+    """
+    Return the entry for one person from a CSV row as read by `load_data`.
+    """
+    return {
+        "name": row["name"],
+        "mother": row["mother"] or None,
+        "father": row["father"] or None,
+        "trait": (True if row["trait"] == "1" else
+                  False if row["trait"] == "0" else None)
+    }
+
+
 def powerset(s):
     """
     Return a list of all possible subsets of set s.
@@ -219,6 +769,115 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
             probabilities[person]['trait'][False] += p
 
 
+class JointEvaluator():
+    """
+    Computes the joint probabilities of many assignments of genes and
+    traits to `people` at once.
+
+    An assignment is encoded as a pair of tuples, holding the number of
+    copies of the gene each person has and whether they have the trait
+    (0 or 1), in the order of `people`. Each person's log probability
+    given their parents' genes is looked up in a nested table built
+    once, indexed by the parents' gene counts, then their own gene count
+    and trait. A batch is evaluated a person at a time, doing the
+    lookups for every assignment in the batch with `map`.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.parents = []
+        self.tables = []
+        for name in self.names:
+            parents = [
+                index[parent]
+                for parent in (people[name]["mother"], people[name]["father"])
+                if parent is not None
+            ]
+            self.parents.append(parents)
+            self.tables.append(_log_table(len(parents), ()))
+
+    def encode_genes(self, one_gene, two_genes):
+        """Return the gene counts of an assignment given as sets of names."""
+        counts = dict.fromkeys(self.names, 0)
+        counts.update(dict.fromkeys(one_gene, 1))
+        counts.update(dict.fromkeys(two_genes, 2))
+        return tuple(counts.values())
+
+    def encode_traits(self, have_trait):
+        """Return the traits of an assignment given as a set of names."""
+        return tuple(int(name in have_trait) for name in self.names)
+
+    def log_joint(self, batch):
+        """
+        Return the natural logarithm of the joint probability of each
+        encoded assignment in `batch`, or -inf if it is impossible.
+        """
+        if not batch:
+            return []
+        genes = list(zip(*(assignment[0] for assignment in batch)))
+        traits = list(zip(*(assignment[1] for assignment in batch)))
+        logs = [0.0] * len(batch)
+        for i, parents in enumerate(self.parents):
+            columns = [genes[parent] for parent in parents]
+            columns += [genes[i], traits[i]]
+            values = map(self.tables[i].__getitem__, columns[0])
+            for column in columns[1:]:
+                values = map(getitem, values, column)
+            logs = list(map(add, logs, values))
+        return logs
+
+    def update(self, probabilities, batch):
+        """
+        Add the joint probability of each encoded assignment in `batch`
+        to `probabilities`, as `update` does for a single assignment.
+        """
+        if not batch:
+            return
+        weights = list(map(math.exp, self.log_joint(batch)))
+        genes = list(zip(*(assignment[0] for assignment in batch)))
+        traits = list(zip(*(assignment[1] for assignment in batch)))
+        for i, name in enumerate(self.names):
+            for count in probabilities[name]["gene"]:
+                probabilities[name]["gene"][count] += sum(itertools.compress(
+                    weights, map(count.__eq__, genes[i])
+                ))
+            for value in probabilities[name]["trait"]:
+                probabilities[name]["trait"][value] += sum(itertools.compress(
+                    weights, map(int(value).__eq__, traits[i])
+                ))
+
+
+def _log_table(num_parents, parent_counts):
+    """
+    Return the nested table of log probabilities of a person's gene
+    count and trait given the gene counts of their `num_parents` known
+    parents, after the first of which are fixed to `parent_counts`.
+    """
+    if len(parent_counts) < num_parents:
+        return [
+            _log_table(num_parents, parent_counts + (count,))
+            for count in range(3)
+        ]
+    table = []
+    for count in range(3):
+        if num_parents == 0:
+            gene = PROBS["gene"][count]
+        else:
+            gene = inheritance_probability(
+                count, *parents_passing(parent_counts)
+            )
+        table.append([
+            _log(gene * PROBS["trait"][count][trait])
+            for trait in (False, True)
+        ])
+    return table
+
+
+def _log(p):
+    return math.log(p) if p > 0 else -math.inf
+
+
 def normalize(probabilities):
     """
     Update `probabilities` such that each probability distribution
@@ -231,10 +890,18 @@ def normalize(probabilities):
         for val in probabilities[person]['gene']:
             probabilities[person]['gene'][val] /= total
 
+        total = 0
         for val in probabilities[person]['trait']:
             total += probabilities[person]['trait'][val]
         for val in probabilities[person]['trait']:
             probabilities[person]['trait'][val] /= total
 
+
+METHODS = {
+    "enumeration": enumerate_probabilities,
+    "elimination": eliminate_probabilities,
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,115 @@
+import math
+import unittest
+
+import heredity
+
+
+def family(*rows):
+    """Return people as `load_data` would from (name, mother, father,
+    trait) rows."""
+    return {
+        name: {"name": name, "mother": mother, "father": father,
+               "trait": trait}
+        for name, mother, father, trait in rows
+    }
+
+
+# Small families like the ones distributed with the project's data
+FAMILIES = {
+    "family0": family(
+        ("Harry", "Lily", "James", None),
+        ("James", None, None, True),
+        ("Lily", None, None, False),
+    ),
+    "family2": family(
+        ("Arthur", None, None, False),
+        ("Hermione", None, None, False),
+        ("Molly", None, None, None),
+        ("Ron", "Molly", "Arthur", False),
+        ("Rose", "Ron", "Hermione", True),
+    ),
+}
+
+SAMPLES = 20000
+SEED = 2024
+
+# Largest error allowed, in standard errors at the effective sample size
+MAX_ERRORS = 5
+
+
+def sibship(children, traits=False):
+    """Return a couple and `children` children, with every third child
+    known to have the trait if `traits` is true."""
+    return family(
+        ("Mother", None, None, None),
+        ("Father", None, None, True),
+        *((f"Child{i}", "Mother", "Father",
+           (i % 3 == 0) if traits else None) for i in range(children))
+    )
+
+
+class EliminationTest(unittest.TestCase):
+
+    def test_matches_enumeration(self):
+        for name, people in FAMILIES.items():
+            with self.subTest(family=name):
+                exact = heredity.enumerate_probabilities(people)
+                estimate = heredity.eliminate_probabilities(people)
+                for person in people:
+                    for count, p in exact[person]["gene"].items():
+                        self.assertAlmostEqual(
+                            estimate[person]["gene"][count], p, places=12
+                        )
+
+    def test_wide_sibship(self):
+        # Hundreds of messages into one cluster used to underflow to zero
+        small = heredity.eliminate_probabilities(sibship(3))
+        wide = heredity.eliminate_probabilities(sibship(400))
+        for count in range(3):
+            self.assertAlmostEqual(wide["Mother"]["gene"][count],
+                                   small["Mother"]["gene"][count])
+        wide = heredity.eliminate_probabilities(sibship(400, traits=True))
+        for person in ("Mother", "Father", "Child1"):
+            self.assertAlmostEqual(sum(wide[person]["gene"].values()), 1)
+
+
+class SamplerTest(unittest.TestCase):
+
+    def test_samplers_match_exact(self):
+        for name, people in FAMILIES.items():
+            exact = heredity.eliminate_probabilities(people)
+            for method in heredity.SAMPLERS:
+                with self.subTest(family=name, method=method):
+                    report = {}
+                    estimate = heredity.sample_probabilities(
+                        people, method, SAMPLES, seed=SEED, report=report
+                    )
+                    ess = report["ess"]
+                    self.assertGreater(ess, 0)
+                    for person in people:
+                        for field in ("gene", "trait"):
+                            for value, p in exact[person][field].items():
+                                bound = MAX_ERRORS * math.sqrt(
+                                    p * (1 - p) / ess
+                                ) + 1e-9
+                                self.assertAlmostEqual(
+                                    estimate[person][field][value], p,
+                                    delta=bound,
+                                    msg=f"{person} {field} {value}"
+                                )
+
+    def test_seed_independent_of_workers(self):
+        people = FAMILIES["family2"]
+        for method in heredity.SAMPLERS:
+            with self.subTest(method=method):
+                serial = heredity.sample_probabilities(
+                    people, method, 2000, seed=SEED, workers=1
+                )
+                parallel = heredity.sample_probabilities(
+                    people, method, 2000, seed=SEED, workers=3
+                )
+                self.assertEqual(serial, parallel)
+
+
+if __name__ == "__main__":
+    unittest.main()
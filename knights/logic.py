@@ -1,3 +1,4 @@
+import heapq
 import itertools
 
 
@@ -226,7 +227,27 @@ class Biconditional(Sentence):
 
 
 def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    """
+    Checks if knowledge base entails query.
+
+    The knowledge base and the negated query are converted to clauses,
+    and the knowledge base entails the query exactly when no model
+    satisfies them all. Sentences of types other than those above are
+    checked by enumerating every model instead.
+    """
+    cnf = CNF()
+    try:
+        knowledge = cnf.encode(knowledge)
+        query = cnf.encode(query)
+    except TypeError:
+        return model_check_enumerate(knowledge, query)
+    cnf.add([knowledge])
+    cnf.add([-query])
+    return not satisfiable(cnf.clauses, cnf.num_vars)
+
+
+def model_check_enumerate(knowledge, query):
+    """Checks if knowledge base entails query, by enumerating models."""
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -261,3 +282,247 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+class CNF():
+    """
+    Clauses equisatisfiable with the sentences encoded so far, built by
+    the Tseitin transformation.
+
+    Variables are numbered from 1 and a clause is a list of literals:
+    `v` for variable `v` being true and `-v` for it being false. Each
+    symbol gets a variable, and each distinct compound sentence gets one
+    more, tied to its operands by clauses stating that it is true
+    exactly when the sentence is, so the clauses grow linearly with the
+    sentences rather than exponentially.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.num_vars = 0
+        self.symbols = {}
+        self.cache = {}
+        self.true = None
+
+    def add(self, clause):
+        self.clauses.append(clause)
+
+    def variable(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def constant(self, value):
+        """Returns a literal that is always `value`."""
+        if self.true is None:
+            self.true = self.variable()
+            self.add([self.true])
+        return self.true if value else -self.true
+
+    def encode(self, sentence):
+        """
+        Returns a literal that is true exactly when `sentence` is,
+        adding the clauses defining it. Raises TypeError for sentences
+        of other types than those in this module.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.variable()
+            return self.symbols[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.encode(sentence.operand)
+        if sentence in self.cache:
+            return self.cache[sentence]
+
+        if isinstance(sentence, (And, Or)):
+            is_and = isinstance(sentence, And)
+            operands = sentence.conjuncts if is_and else sentence.disjuncts
+            literals = [self.encode(operand) for operand in operands]
+            if not literals:
+                literal = self.constant(is_and)
+            elif len(literals) == 1:
+                literal = literals[0]
+            else:
+                literal = self.variable()
+                sign = 1 if is_and else -1
+                # An And is true iff every operand is; an Or is the dual
+                for operand in literals:
+                    self.add([-sign * literal, sign * operand])
+                self.add([sign * literal] + [-sign * operand
+                                             for operand in literals])
+        elif isinstance(sentence, Implication):
+            antecedent = self.encode(sentence.antecedent)
+            consequent = self.encode(sentence.consequent)
+            literal = self.variable()
+            self.add([-literal, -antecedent, consequent])
+            self.add([literal, antecedent])
+            self.add([literal, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.encode(sentence.left)
+            right = self.encode(sentence.right)
+            literal = self.variable()
+            self.add([-literal, -left, right])
+            self.add([-literal, left, -right])
+            self.add([literal, left, right])
+            self.add([literal, -left, -right])
+        else:
+            raise TypeError(f"cannot convert {type(sentence).__name__}")
+        self.cache[sentence] = literal
+        return literal
+
+
+def satisfiable(clauses, num_vars):
+    """
+    Returns whether some assignment to variables 1 to `num_vars` makes
+    every clause true.
+
+    Uses conflict-driven clause learning: unit propagation over two
+    watched literals per clause, a clause learned from the first unique
+    implication point of each conflict, backjumping to the level where
+    it becomes unit, and branching on the most active variable.
+    """
+    # Value of each variable: 1 true, -1 false, 0 unassigned
+    values = [0] * (num_vars + 1)
+    levels = [0] * (num_vars + 1)
+    reasons = [None] * (num_vars + 1)
+    activity = [0.0] * (num_vars + 1)
+    phases = [-1] * (num_vars + 1)
+    watches = {}
+    trail = []
+    limits = []
+
+    def value(literal):
+        v = values[abs(literal)]
+        return v if literal > 0 else -v
+
+    def assign(literal, reason):
+        v = abs(literal)
+        values[v] = 1 if literal > 0 else -1
+        levels[v] = len(limits)
+        reasons[v] = reason
+        trail.append(literal)
+
+    def watch(clause):
+        watches.setdefault(clause[0], []).append(clause)
+        watches.setdefault(clause[1], []).append(clause)
+
+    units = []
+    for clause in clauses:
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            continue
+        if not clause:
+            return False
+        if len(clause) == 1:
+            units.append(clause[0])
+        else:
+            watch(clause)
+    for literal in units:
+        if value(literal) < 0:
+            return False
+        if value(literal) == 0:
+            assign(literal, None)
+
+    # Position in the trail up to which assignments have been propagated
+    head = 0
+
+    def propagate():
+        """Returns a clause made false by propagation, or None."""
+        nonlocal head
+        while head < len(trail):
+            false = -trail[head]
+            head += 1
+            watching = watches.get(false, [])
+            kept = []
+            for i, clause in enumerate(watching):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if value(clause[0]) > 0:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    if value(clause[k]) >= 0:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value(clause[0]) < 0:
+                        kept.extend(watching[i + 1:])
+                        watches[false] = kept
+                        head = len(trail)
+                        return clause
+                    assign(clause[0], clause)
+            watches[false] = kept
+        return None
+
+    heap = [(0.0, v) for v in range(1, num_vars + 1)]
+    bump = 1.0
+
+    while True:
+        conflict = propagate()
+        if conflict is not None:
+            if not limits:
+                return False
+
+            # Resolve back to the first unique implication point
+            learned = [None]
+            seen = set()
+            pending = 0
+            index = len(trail)
+            clause = conflict
+            while True:
+                for other in clause:
+                    v = abs(other)
+                    if v in seen or levels[v] == 0:
+                        continue
+                    seen.add(v)
+                    activity[v] += bump
+                    heapq.heappush(heap, (-activity[v], v))
+                    if levels[v] == len(limits):
+                        pending += 1
+                    else:
+                        learned.append(other)
+                index -= 1
+                while abs(trail[index]) not in seen:
+                    index -= 1
+                literal = trail[index]
+                pending -= 1
+                if pending == 0:
+                    break
+                clause = reasons[abs(literal)]
+            learned[0] = -literal
+            bump *= 1.05
+
+            # Backjump to the second highest level in the learned clause
+            level = 0
+            if len(learned) > 1:
+                k = max(range(1, len(learned)),
+                        key=lambda i: levels[abs(learned[i])])
+                learned[1], learned[k] = learned[k], learned[1]
+                level = levels[abs(learned[1])]
+            if len(limits) > level:
+                start = limits[level]
+                for literal in trail[start:]:
+                    v = abs(literal)
+                    phases[v] = values[v]
+                    values[v] = 0
+                    reasons[v] = None
+                    heapq.heappush(heap, (-activity[v], v))
+                del trail[start:]
+                del limits[level:]
+            head = len(trail)
+            if len(learned) > 1:
+                watch(learned)
+                assign(learned[0], learned)
+            else:
+                assign(learned[0], None)
+            continue
+
+        # Branch on the most active unassigned variable
+        while heap and values[heap[0][1]] != 0:
+            heapq.heappop(heap)
+        if not heap:
+            return True
+        v = heapq.heappop(heap)[1]
+        limits.append(len(trail))
+        assign(v if phases[v] > 0 else -v, None)
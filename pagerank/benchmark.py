@@ -0,0 +1,244 @@
+import argparse
+import json
+import math
+import platform
+import random
+import time
+from array import array
+from itertools import accumulate
+
+import pagerank
+from graph import LinkGraph
+
+
+SIZES = [100, 1000, 10000, 100000, 1000000]
+AVERAGE_DEGREE = 5
+DANGLING_FRACTION = 0.5
+MAX_REDRAWS = 10
+REFERENCE_TOLERANCE = 1e-10
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py [options]"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        metavar="N", help="numbers of pages to generate")
+    parser.add_argument("--graphs", nargs="+", choices=GENERATORS,
+                        default=list(GENERATORS),
+                        help="kinds of synthetic graph")
+    parser.add_argument("--methods", nargs="+", choices=pagerank.SOLVERS,
+                        default=list(pagerank.SOLVERS),
+                        help="iterative solvers to time")
+    parser.add_argument("--samples", type=int, default=pagerank.SAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="FILE", default="benchmark.json",
+                        help="write results as JSON to FILE")
+    args = parser.parse_args()
+    if args.samples < 1:
+        parser.error("--samples must be positive")
+
+    results = []
+    for kind in args.graphs:
+        for size in args.sizes:
+            results.append(run_graph(kind, size, args))
+            print_result(results[-1])
+
+    report = {
+        "samples": args.samples,
+        "seed": args.seed,
+        "damping": pagerank.DAMPING,
+        "tolerance": pagerank.TOLERANCE,
+        "reference_tolerance": REFERENCE_TOLERANCE,
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "graphs": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def run_graph(kind, size, args):
+    """
+    Generates a `kind` graph of `size` pages, then times the sampler and
+    each of the iterative solvers in `args.methods` on it, measuring
+    their L1 error against a tightly converged power iteration.
+    """
+    rng = random.Random(f"{args.seed}:{kind}:{size}")
+    start = time.perf_counter()
+    graph = GENERATORS[kind](size, rng)
+    generate_seconds = time.perf_counter() - start
+
+    reference = pagerank.solve_pagerank(
+        graph, pagerank.DAMPING, tolerance=REFERENCE_TOLERANCE
+    )
+    estimators = {}
+
+    start = time.perf_counter()
+    counts = pagerank.walk(graph, pagerank.DAMPING, args.samples, rng=rng)
+    estimators["sampling"] = {
+        "seconds": time.perf_counter() - start,
+        "iterations": None,
+        "l1_error": l1_error(
+            [count / args.samples for count in counts], reference
+        ),
+    }
+
+    for method in args.methods:
+        report = {}
+        rank = pagerank.solve_pagerank(
+            graph, pagerank.DAMPING, method, report=report
+        )
+        estimators[method] = {
+            "seconds": report["seconds"],
+            "iterations": report["iterations"],
+            "converged": report["converged"],
+            "l1_error": l1_error(rank, reference),
+        }
+
+    return {
+        "graph": kind,
+        "pages": len(graph),
+        "links": len(graph.targets),
+        "dangling": len(graph.dangling()),
+        "generate_seconds": generate_seconds,
+        "estimators": estimators,
+    }
+
+
+def print_result(result):
+    """Prints one table row per estimator run on a graph."""
+    print(f"{result['graph']} graph: {result['pages']} pages, "
+          f"{result['links']} links, {result['dangling']} dangling")
+    print(f"  {'estimator':<14} {'seconds':>9} {'iterations':>10} "
+          f"{'L1 error':>10}")
+    for name, estimate in result["estimators"].items():
+        iterations = estimate["iterations"]
+        iterations = "-" if iterations is None else str(iterations)
+        print(f"  {name:<14} {estimate['seconds']:>9.3f} {iterations:>10} "
+              f"{estimate['l1_error']:>10.2e}")
+
+
+def l1_error(rank, reference):
+    """Returns the L1 distance between two lists of ranks."""
+    return sum(abs(a - b) for a, b in zip(rank, reference))
+
+
+def random_graph(n, rng, degree=AVERAGE_DEGREE, dangling=0.0):
+    """
+    Returns a graph of `n` pages in which each page, other than a
+    `dangling` fraction with no links, links to about `degree` pages
+    chosen uniformly at random.
+    """
+    # One link plus a geometrically distributed number more, with mean
+    # `degree` in all
+    rate = math.log(degree / (degree - 1))
+    sources = array("i")
+    targets = array("i")
+    for page in range(n):
+        if rng.random() < dangling:
+            continue
+        links = 1 + int(rng.expovariate(rate))
+        sources.extend([page] * links)
+        targets.extend(rng.choices(range(n), k=links))
+    return _build(n, sources, targets)
+
+
+def power_law_graph(n, rng, degree=AVERAGE_DEGREE, exponent=2.1):
+    """
+    Returns a graph of `n` pages whose numbers of links and popularity
+    as link targets both follow power laws with the given `exponent`,
+    so that a few hub pages receive most of the links.
+    """
+    # Page i is linked to with weight (i + 1) ** -(1 / (exponent - 1)),
+    # which gives in-degrees a power-law tail; pages are shuffled so the
+    # hubs are not simply the lowest indices
+    order = list(range(n))
+    rng.shuffle(order)
+    cumulative = list(accumulate(
+        (i + 1) ** (-1 / (exponent - 1)) for i in range(n)
+    ))
+
+    # At least one link, plus a Pareto-distributed number more, scaled
+    # to give `degree` links on average
+    scale = _pareto_scale(n, degree, exponent - 1)
+    sources = array("i")
+    targets = array("i")
+    for page in range(n):
+        links = min(n - 1, 1 + int(scale * rng.paretovariate(exponent - 1)))
+        # Hubs are drawn again and again, so draw until the links are
+        # distinct. Pages with very many links may still fall short after
+        # `MAX_REDRAWS` draws; they are topped up uniformly, as the pages
+        # left undrawn are the unpopular ones anyway
+        chosen = set()
+        for _ in range(MAX_REDRAWS):
+            chosen.update(
+                order[i] for i in rng.choices(
+                    range(n), cum_weights=cumulative, k=links - len(chosen)
+                )
+            )
+            chosen.discard(page)
+            if len(chosen) == links:
+                break
+        while len(chosen) < links:
+            target = rng.randrange(n)
+            if target != page:
+                chosen.add(target)
+        sources.extend([page] * links)
+        targets.extend(chosen)
+    return _build(n, sources, targets)
+
+
+def _pareto_scale(n, degree, alpha):
+    """
+    Returns the scale at which `min(n, 1 + int(scale * X))`, for X drawn
+    by `paretovariate(alpha)`, has mean `degree`.
+    """
+    head = min(n, 1000)
+
+    def mean(scale):
+        # The mean is 1 plus the sum over k from 1 to n - 1 of the chance
+        # that scale * X is at least k; terms past `head` are integrated
+        total = 1 + sum(min(1, (scale / k) ** alpha) for k in range(1, head))
+        if n > head:
+            a = head - 0.5
+            b = n - 0.5
+            total += scale ** alpha * (a ** (1 - alpha) - b ** (1 - alpha)) \
+                / (alpha - 1)
+        return total
+
+    low, high = 0.0, float(degree)
+    while mean(high) < degree and high < head:
+        high *= 2
+    for _ in range(60):
+        middle = (low + high) / 2
+        if mean(middle) < degree:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def dangling_graph(n, rng):
+    """
+    Returns a random graph of `n` pages in which a `DANGLING_FRACTION`
+    of the pages have no links at all.
+    """
+    return random_graph(n, rng, dangling=DANGLING_FRACTION)
+
+
+def _build(n, sources, targets):
+    pages = [f"{i}.html" for i in range(n)]
+    return LinkGraph.from_edges(pages, sources, targets)
+
+
+GENERATORS = {
+    "random": random_graph,
+    "power-law": power_law_graph,
+    "dangling": dangling_graph,
+}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# A saved graph starts with MAGIC, the format version and the length of
+# a JSON header giving the counts of pages, links and name bytes. Four
+# sections follow, each starting on a multiple of SECTION_ALIGNMENT so
+# that the mapped bytes can be cast to int32 in place: the link offsets
+# and link targets, the offsets of each page name, and the UTF-8 names.
+MAGIC = b"LINKGRPH"
+VERSION = 1
+PREFIX = struct.Struct("<8sII")
+SECTION_ALIGNMENT = 8
+
+
+class LinkGraph():
+    """
+    Pages and the links between them, with pages numbered by their
+    position in `pages` and links stored in CSR form: the pages linked
+    to by page `i` are `targets[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, pages, offsets, targets, filename=None):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+        self.filename = filename
+        self._inbound = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from a dictionary mapping each page to the set of
+        pages it links to. Links to pages outside the corpus and links
+        from a page to itself are ignored.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        offsets = array("i", [0])
+        targets = array("i")
+        for i, page in enumerate(pages):
+            targets.extend(sorted(
+                index[link] for link in corpus[page]
+                if link in index and index[link] != i
+            ))
+            offsets.append(len(targets))
+        return cls(pages, offsets, targets)
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Build a graph over `pages` from parallel arrays of page indices,
+        one entry per link. Duplicate links and self-links are dropped.
+        """
+        n = len(pages)
+        counts = array("i", bytes(4 * (n + 1)))
+        for source in sources:
+            counts[source + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        ordered = array("i", bytes(4 * len(sources)))
+        cursor = counts[:-1]
+        for source, target in zip(sources, targets):
+            ordered[cursor[source]] = target
+            cursor[source] += 1
+
+        offsets = array("i", [0])
+        links = array("i")
+        for i in range(n):
+            row = set(ordered[counts[i]:counts[i + 1]])
+            row.discard(i)
+            links.extend(sorted(row))
+            offsets.append(len(links))
+        return cls(pages, offsets, links)
+
+    @classmethod
+    def load_adjacency(cls, filename):
+        """
+        Build a graph from an adjacency file written by
+        `pagerank.crawl_to_file`, reading it twice so that only page
+        names and link arrays are held in memory.
+        """
+        with open(filename, encoding="utf-8") as f:
+            pages = sorted(
+                line.rstrip("\n").split("\t", 1)[0] for line in f
+            )
+        index = {page: i for i, page in enumerate(pages)}
+
+        sources = array("i")
+        targets = array("i")
+        with open(filename, encoding="utf-8") as f:
+            for line in f:
+                page, *links = line.rstrip("\n").split("\t")
+                source = index[page]
+                for link in links:
+                    target = index.get(link)
+                    if target is not None:
+                        sources.append(source)
+                        targets.append(target)
+        return cls.from_edges(pages, sources, targets)
+
+    @classmethod
+    def load(cls, filename, source=None):
+        """
+        Memory-map a graph written by `save`, without copying its arrays
+        or decoding its page names up front.
+
+        Return None if the file is missing or unreadable, was written by
+        another version or on a machine of different byte order, or
+        `source` is given and differs from the one it was saved with.
+        Also return None if the header's counts do not match the size of
+        the file or the first and last offsets of each section, as when
+        the file was truncated or overwritten.
+        """
+        try:
+            f = open(filename, "rb")
+        except OSError:
+            return None
+        with f:
+            prefix = f.read(PREFIX.size)
+            if len(prefix) < PREFIX.size:
+                return None
+            magic, version, header_length = PREFIX.unpack(prefix)
+            if magic != MAGIC or version != VERSION:
+                return None
+            try:
+                header = json.loads(f.read(header_length))
+                counts = [header[key] for key in ("pages", "links", "names")]
+                matches = (header["byteorder"] == sys.byteorder and (
+                    source is None or header["source"] == source
+                ))
+            except (ValueError, TypeError, KeyError):
+                return None
+            if not matches or not all(
+                isinstance(count, int) and count >= 0 for count in counts
+            ):
+                return None
+            buffer = memoryview(
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+
+        n, links, name_bytes = counts
+        sections = []
+        end = PREFIX.size + header_length
+        for size in (4 * (n + 1), 4 * links, 4 * (n + 1), name_bytes):
+            start = _section_start(end)
+            end = start + size
+            if end > len(buffer):
+                return None
+            sections.append(buffer[start:end])
+        offsets, targets, name_offsets = (
+            section.cast("i") for section in sections[:3]
+        )
+        if (offsets[0] != 0 or offsets[n] != links
+                or name_offsets[0] != 0 or name_offsets[n] != name_bytes):
+            return None
+        return cls(PageNames(name_offsets, sections[3]), offsets, targets,
+                   filename=os.path.abspath(filename))
+
+    def save(self, filename, source=None):
+        """
+        Write the graph to `filename` in a compact binary form that
+        `load` memory-maps: a JSON header, then the link offsets and
+        targets and the offsets of each page name as 32-bit integers,
+        then the UTF-8 page names back to back. `source` is any JSON
+        value identifying what the graph was built from.
+
+        An existing file is only replaced once the new one is complete,
+        so processes that already mapped it keep a consistent graph.
+        """
+        names = array("i", [0])
+        encoded = []
+        for page in self.pages:
+            encoded.append(page.encode("utf-8"))
+            names.append(names[-1] + len(encoded[-1]))
+        header = json.dumps({
+            "source": source,
+            "byteorder": sys.byteorder,
+            "pages": len(self.pages),
+            "links": len(self.targets),
+            "names": names[-1],
+        }).encode("utf-8")
+
+        partial = f"{filename}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            for values in (self.offsets, self.targets, names):
+                _start_section(f)
+                f.write(array("i", values).tobytes())
+            _start_section(f)
+            f.writelines(encoded)
+        os.replace(partial, filename)
+
+    def __getstate__(self):
+        # A mapped graph is pickled as its file name, so that processes
+        # it is sent to map the same file instead of receiving a copy
+        if self.filename is not None:
+            return {"filename": self.filename}
+        return {**self.__dict__, "_inbound": None}
+
+    def __setstate__(self, state):
+        if "pages" not in state:
+            graph = LinkGraph.load(state["filename"])
+            if graph is None:
+                raise OSError(f"cannot map graph {state['filename']!r}")
+            state = graph.__dict__
+        self.__dict__.update(state)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def links(self, i):
+        """Returns the indices of the pages linked to by page `i`."""
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def out_degree(self, i):
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def dangling(self):
+        """Returns the indices of pages with no links."""
+        offsets = self.offsets
+        return [
+            i for i in range(len(self.pages))
+            if offsets[i] == offsets[i + 1]
+        ]
+
+    def inbound(self):
+        """
+        Returns (offsets, sources) CSR arrays of the links into each
+        page, computed once and then cached.
+        """
+        if self._inbound is None:
+            n = len(self.pages)
+            counts = array("i", bytes(4 * (n + 1)))
+            for target in self.targets:
+                counts[target + 1] += 1
+            for i in range(n):
+                counts[i + 1] += counts[i]
+            sources = array("i", bytes(4 * len(self.targets)))
+            cursor = counts[:-1]
+            for i in range(n):
+                for target in self.links(i):
+                    sources[cursor[target]] = i
+                    cursor[target] += 1
+            self._inbound = (counts, sources)
+        return self._inbound
+
+    def ranks(self, values):
+        """Returns a {page: value} dictionary for a list of values."""
+        return dict(zip(self.pages, values))
+
+
+class PageNames():
+    """
+    Sequence of page names stored as UTF-8 bytes back to back, where
+    name `i` is `data[offsets[i]:offsets[i + 1]]`, decoded on access.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("page index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        data = self.data
+        offsets = self.offsets
+        for i in range(len(self)):
+            yield str(data[offsets[i]:offsets[i + 1]], "utf-8")
+
+
+def _section_start(position):
+    """Returns the first multiple of SECTION_ALIGNMENT from `position`."""
+    return -(-position // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+
+def _start_section(f):
+    """Pads the file `f` with zeros up to where the next section starts."""
+    f.write(bytes(_section_start(f.tell()) - f.tell()))
@@ -1,45 +1,155 @@
 # pylint: disable=unused-variable
 
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
 import os
+import posixpath
 import random
-import re
 import sys
+import time
+from html.parser import HTMLParser
+from collections import OrderedDict, deque
+from itertools import accumulate
+from operator import itemgetter, mul, sub
+from urllib.parse import unquote, urlsplit
+
+from graph import LinkGraph
 
 
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 0.000001
+MAX_ITERATIONS = 1000
+BATCHES = 10
+CHUNK_SIZE = 65536
+EXTRAPOLATE_EVERY = 10
+ADAPTIVE_CHECK_EVERY = 10
+TOPIC_CACHE_SIZE = 32
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser(usage="python pagerank.py corpus")
+    parser.add_argument("corpus")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of sampling processes")
+    parser.add_argument("--seed", type=int,
+                        help="seed for reproducible sampling")
+    parser.add_argument("--edges", metavar="FILE",
+                        help="crawl to an adjacency file on disk and rank "
+                             "from it instead of from memory")
+    parser.add_argument("--graph", metavar="FILE",
+                        help="memory-map the crawled graph from FILE, "
+                             "crawling and saving it there if it is "
+                             "missing or out of date")
+    parser.add_argument("--state", metavar="FILE",
+                        help="update iterated ranks incrementally from the "
+                             "previous run saved in FILE")
+    parser.add_argument("--local", action="store_true",
+                        help="with --state, only re-propagate ranks "
+                             "around changed pages")
+    parser.add_argument("--method", choices=SOLVERS, default="power",
+                        help="iterative solver")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="stop iterating below this change")
+    parser.add_argument("--max-iterations", type=int, default=MAX_ITERATIONS,
+                        metavar="N",
+                        help="stop iterating after N iterations even if "
+                             "the change is still above the tolerance")
+    parser.add_argument("--norm", choices=NORMS, default="l1",
+                        help="norm used to measure the change")
+    parser.add_argument("--teleport", metavar="PAGE", action="append",
+                        help="also rank for a surfer who only jumps to "
+                             "the given pages (may be repeated)")
+    args = parser.parse_args()
+
+    if args.samples < 1:
+        parser.error("--samples must be positive")
+    if not args.tolerance > 0:
+        parser.error("--tolerance must be positive")
+    if args.max_iterations < 1:
+        parser.error("--max-iterations must be at least 1")
+    if args.local and not args.state:
+        parser.error("--local requires --state")
+    if args.state:
+        unused = [
+            flag for flag, value in [
+                ("--graph", args.graph), ("--edges", args.edges),
+                ("--teleport", args.teleport), ("--seed", args.seed),
+            ] if value is not None
+        ]
+        if args.local and args.method != "power":
+            unused.append("--method")
+        if unused:
+            parser.error(f"{', '.join(unused)} cannot be used with "
+                         f"--state{' --local' if args.local else ''}")
+        ranks, report = update_pagerank(
+            args.corpus, args.state, DAMPING, args.tolerance,
+            local=args.local, workers=args.workers,
+            method=args.method, norm=args.norm,
+            max_iterations=args.max_iterations
+        )
+        print(f"PageRank Results from Incremental Iteration "
+              f"({report['added']} added, {report['removed']} removed, "
+              f"{report['modified']} modified)")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+        return
+
+    if args.graph:
+        corpus = load_graph(args.corpus, args.graph,
+                            workers=args.workers, edges=args.edges)
+    elif args.edges:
+        crawl_to_file(args.corpus, args.edges, workers=args.workers)
+        corpus = LinkGraph.load_adjacency(args.edges)
+    else:
+        corpus = crawl(args.corpus, workers=args.workers)
+    ranks, errors = sample_pagerank_parallel(
+        corpus, DAMPING, args.samples, workers=args.workers, seed=args.seed
+    )
+    print(f"PageRank Results from Sampling (n = {args.samples})")
     for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+        print(f"  {page}: {ranks[page]:.4f} ± {errors[page]:.4f}")
+    report = {}
+    ranks = iterate_pagerank(corpus, DAMPING, args.tolerance,
+                             method=args.method, norm=args.norm,
+                             report=report,
+                             max_iterations=args.max_iterations)
+    if not report["converged"]:
+        print(f"Warning: no convergence to {args.tolerance} in "
+              f"{report['iterations']} iterations (last change "
+              f"{report['residuals'][-1]:.3g})", file=sys.stderr)
+    print(f"PageRank Results from Iteration ({report['method']}, "
+          f"{report['iterations']} iterations, {report['seconds']:.3f} s)")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    if args.teleport:
+        try:
+            ranks = personalized_pagerank(corpus, DAMPING, args.teleport,
+                                          args.tolerance, args.method,
+                                          args.max_iterations)
+        except ValueError as e:
+            sys.exit(f"Invalid --teleport: {e}")
+        print(f"PageRank Results Personalized to "
+              f"{', '.join(sorted(set(args.teleport)))}")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, workers=1):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    Pages are found in subdirectories too, and are named by their path
+    relative to `directory`. Links are resolved relative to the page
+    they appear on. Files are parsed by a pool of `workers` processes.
+    """
+    pages = dict(extract_all(directory, workers))
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -51,6 +161,151 @@ def crawl(directory):
     return pages
 
 
+def crawl_to_file(directory, filename, workers=1):
+    """
+    Parse a directory of HTML pages as `crawl` does, but write each page
+    and its links to an adjacency file as soon as they are found instead
+    of keeping them in memory. Each line holds a page followed by the
+    pages it links to, separated by tabs. Links to pages outside the
+    corpus are kept; `LinkGraph.load_adjacency` drops them.
+    Return the number of pages written.
+    """
+    count = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        for page, links in extract_all(directory, workers):
+            f.write("\t".join([page, *sorted(links)]) + "\n")
+            count += 1
+    return count
+
+
+def load_graph(directory, filename, workers=1, edges=None):
+    """
+    Return the LinkGraph of the pages under `directory`, memory-mapped
+    from the graph file `filename` if it was saved from the same files,
+    so that nothing is parsed. Otherwise the pages are crawled, through
+    the adjacency file `edges` if given, and the graph is saved to
+    `filename` for next time.
+    """
+    source = corpus_fingerprint(directory)
+    graph = LinkGraph.load(filename, source)
+    if graph is None:
+        if edges:
+            crawl_to_file(directory, edges, workers)
+            graph = LinkGraph.load_adjacency(edges)
+        else:
+            graph = LinkGraph.from_corpus(crawl(directory, workers))
+        graph.save(filename, source)
+        graph = LinkGraph.load(filename)
+    return graph
+
+
+def corpus_fingerprint(directory):
+    """
+    Return a digest of the name, size and modification time of each
+    HTML page under `directory`, which changes whenever a page is added,
+    removed or edited.
+    """
+    digest = hashlib.sha256()
+    for page in sorted(find_pages(directory)):
+        info = os.stat(os.path.join(directory, page))
+        digest.update(f"{page}\0{info.st_size}\0{info.st_mtime_ns}\n"
+                      .encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+def extract_all(directory, workers=1):
+    """
+    Yield a (page, links) pair for each HTML page under `directory`,
+    parsing files in a pool of `workers` processes if more than one.
+    """
+    yield from extract_pages(directory, find_pages(directory), workers)
+
+
+def extract_pages(directory, pages, workers=1):
+    """
+    Yield a (page, links) pair for each of the given `pages` under
+    `directory`, parsing in a pool of `workers` processes as above.
+    """
+    tasks = ((directory, page) for page in pages)
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            yield from pool.imap_unordered(_extract_task, tasks, 16)
+    else:
+        yield from map(_extract_task, tasks)
+
+
+def find_pages(directory):
+    """
+    Yield the path of each .html file under `directory`, relative to it
+    and separated by "/".
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith(".html"):
+                path = os.path.relpath(os.path.join(root, filename),
+                                       directory)
+                yield path.replace(os.sep, "/")
+
+
+def extract_links(directory, page):
+    """
+    Return the set of pages linked to by `page`, feeding the file to an
+    HTML parser a chunk at a time rather than reading it whole.
+    """
+    parser = LinkParser()
+    with open(os.path.join(directory, page), encoding="utf-8",
+              errors="replace") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    links = set(normalize_link(page, href) for href in parser.links)
+    return links - {page, None}
+
+
+def _extract_task(task):
+    directory, page = task
+    return page, extract_links(directory, page)
+
+
+def normalize_link(page, href):
+    """
+    Return the corpus path that `href` on `page` refers to, or None if
+    it points outside the corpus (another site, or above its root).
+    Fragments and query strings are dropped.
+    """
+    href = href.strip().split("#", 1)[0].split("?", 1)[0]
+    if not href or href.startswith("//") or urlsplit(href).scheme:
+        return None
+    if href.startswith("/"):
+        path = href.lstrip("/")
+    else:
+        path = posixpath.join(posixpath.dirname(page), href)
+    path = posixpath.normpath(unquote(path))
+    if path == ".." or path.startswith("../"):
+        return None
+    return path
+
+
+class LinkParser(HTMLParser):
+    """
+    Incremental HTML parser collecting the href of every <a> tag.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value is not None:
+                    self.links.append(value)
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -78,84 +333,806 @@ def transition_model(corpus, page, damping_factor):
 
  
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, walkers=1, rng=random):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    `corpus` may be a dictionary of links or a LinkGraph. The samples
+    are shared between `walkers` independent random surfers, each
+    starting at a random page, drawing from `rng`.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    result = {}
-    for link in corpus:
-        result[link] = 0
+    if n < 1:
+        raise ValueError(f"number of samples must be positive, not {n}")
+    graph = as_graph(corpus)
+    counts = walk(graph, damping_factor, n, walkers, rng)
+    return graph.ranks([count / n for count in counts])
 
-    sample = None
 
-    for i in range(n):
-        if sample == None:
-            lst = list(corpus.keys())
-            # randomly choose a sample
-            sample = random.choice(lst)
-            result[sample] += 1
-        else:
-            # get probability distribution on current sample
-            next_sample = transition_model(corpus, sample, damping_factor)
-            lst = list(next_sample.keys())
-            weights = [next_sample[key] for key in lst]
-            # grab random value using pop()
-            sample = random.choices(lst, weights).pop()
-            result[sample] += 1
+def sample_pagerank_parallel(corpus, damping_factor, n, workers=1,
+                             seed=None, batches=BATCHES):
+    """
+    Return PageRank estimates and their standard errors by sampling `n`
+    pages split into `batches` independent batches, run across a pool of
+    `workers` processes.
+
+    Each batch draws from its own generator, seeded from `seed`, so the
+    results depend only on `seed` and `batches`, not on `workers`.
+    The standard error of each page is that of the mean of the batch
+    estimates.
+
+    Return two dictionaries keyed by page name: the estimated PageRank
+    values, and their standard errors.
+    """
+    if n < 1:
+        raise ValueError(f"number of samples must be positive, not {n}")
+    graph = as_graph(corpus)
+    batches = max(1, min(batches, n))
+    master = random.Random(seed)
+    tasks = [
+        (n // batches + (i < n % batches), master.getrandbits(64))
+        for i in range(batches)
+    ]
+
+    if workers > 1 and batches > 1:
+        with multiprocessing.Pool(
+            min(workers, batches), initializer=_init_sampler,
+            initargs=(graph, damping_factor)
+        ) as pool:
+            results = pool.starmap(_sample_batch, tasks)
+    else:
+        _init_sampler(graph, damping_factor)
+        results = [_sample_batch(*task) for task in tasks]
+
+    totals = [sum(counts) for counts in zip(*results)]
+    ranks = [total / n for total in totals]
+    errors = []
+    for page_counts in zip(*results):
+        if batches < 2:
+            errors.append(math.nan)
+            continue
+        estimates = [
+            count / size for count, (size, _) in zip(page_counts, tasks)
+        ]
+        mean = sum(estimates) / batches
+        variance = sum((x - mean) ** 2 for x in estimates) / (batches - 1)
+        errors.append(math.sqrt(variance / batches))
+    return graph.ranks(ranks), graph.ranks(errors)
+
 
-    # get percentages for each link based on sampling
-    for key, value in result.items():
-        percent = value/n
-        result[key] = percent
-    if round(sum(result.values()), 5) != 1:
-        print(f"Error probabilities add up to {sum(result.values())}")
-    return result
+# Graph and damping factor used by _sample_batch in this process
+_sampler = None
 
 
-def iterate_pagerank(corpus, damping_factor):
+def _init_sampler(graph, damping_factor):
+    global _sampler
+    _sampler = (graph, damping_factor)
+
+
+def _sample_batch(n, seed):
+    graph, damping_factor = _sampler
+    return walk(graph, damping_factor, n, rng=random.Random(seed))
+
+
+def walk(graph, damping_factor, n, walkers=1, rng=random):
+    """
+    Return a list counting how often each page of `graph` is visited in
+    `n` steps of random surfing, shared between `walkers` surfers.
+
+    Each step takes a single uniform draw `u`: below the damping factor
+    it picks a link of the current page by scaling `u`, otherwise (or
+    from a page without links) it picks any page by scaling `u` again.
+    """
+    size = len(graph)
+    counts = [0] * size
+    if size == 0 or n <= 0:
+        return counts
+    offsets = graph.offsets
+    targets = graph.targets
+    uniform = rng.random
+    last = size - 1
+    teleport = 1 - damping_factor
+
+    walkers = max(1, min(walkers, n))
+    for w in range(walkers):
+        # Each surfer's first sample is its random starting page
+        page = rng.randrange(size)
+        counts[page] += 1
+        for _ in range(n // walkers + (w < n % walkers) - 1):
+            start = offsets[page]
+            degree = offsets[page + 1] - start
+            u = uniform()
+            if degree == 0:
+                page = min(int(u * size), last)
+            elif u < damping_factor:
+                page = targets[start + min(int(u / damping_factor * degree),
+                                           degree - 1)]
+            else:
+                page = min(int((u - damping_factor) / teleport * size), last)
+            counts[page] += 1
+    return counts
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     method="power", norm="l1", report=None,
+                     max_iterations=MAX_ITERATIONS):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    `corpus` may be a dictionary of links or a LinkGraph. The links are
+    compiled once into arrays, and the ranks are updated by one of the
+    `SOLVERS` until the change between iterations, measured by one of
+    the `NORMS`, is below `tolerance` or `max_iterations` have been
+    made. A page with no links is treated as linking to every page. If
+    `report` is a dict, the solver's iteration count, residual history,
+    whether it converged and wall time are stored in it.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    result = {}
-    change = 1
-    N = len(corpus)
-    for link in corpus:
-        result[link] = 1 / N
-    
-    while change >= 0.001:
-        # reset change
-        change = 0
-        # copy current state to calculate new PRs
-        prev_state = result.copy()
-        # create list of parent pages.
-        for page in result:
-            p1 = [link for link in corpus if page in corpus[link]]
-            # first part of PR equation
-            first = (1-damping_factor) / N
-            second = []
-            if len(p1) != 0:
-                for p in p1:
-                    val = prev_state[p] / len(corpus[p])
-                    second.append(val)
-            second_sum = sum(second)
-            result[page] = first + damping_factor*(second_sum)
-            # calculate change during this iteration
-            new_change = abs(result[page] - prev_state[page])
-            if change < new_change:
-                change = new_change
-    dict_sum = sum(result.values())
-    result = {key: value/dict_sum for key, value in result.items()}
-    return result
+    graph = as_graph(corpus)
+    return graph.ranks(solve_pagerank(
+        graph, damping_factor, method, tolerance, norm, report=report,
+        max_iterations=max_iterations
+    ))
+
+
+def power_iterate(graph, damping_factor, tolerance=TOLERANCE, initial=None):
+    """
+    Return the list of PageRank values of the pages of `graph`,
+    by power iteration until the L1 change is below `tolerance`,
+    starting from the list `initial` if given and uniform ranks if not.
+    """
+    return solve_pagerank(graph, damping_factor, "power", tolerance,
+                          initial=initial)
+
+
+def solve_pagerank(graph, damping_factor, method="power",
+                   tolerance=TOLERANCE, norm="l1", initial=None, report=None,
+                   teleport=None, max_iterations=MAX_ITERATIONS):
+    """
+    Return the list of PageRank values of the pages of `graph` computed
+    by the named solver in `SOLVERS`, stopping once the change between
+    iterations measured by the named norm in `NORMS` is below
+    `tolerance`, or after `max_iterations` iterations if it never is,
+    as rounding can prevent for very small tolerances. Iteration starts
+    from the list `initial` if given and uniform ranks if not.
+
+    If `teleport` is given, it is a list of probabilities summing to 1
+    with which the random surfer jumps to each page, in place of the
+    uniform jump. Pages without links still link to every page.
+
+    If `report` is a dict, the method, number of iterations, list of
+    residuals, whether the tolerance was reached and wall time in
+    seconds are stored in it.
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"unknown method {method!r}")
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm {norm!r}")
+    if not tolerance > 0:
+        raise ValueError(f"tolerance must be positive, not {tolerance}")
+    if max_iterations < 1:
+        raise ValueError("max_iterations must be at least 1")
+    start = time.perf_counter()
+    n = len(graph)
+    residuals = []
+    converged = True
+    if n == 0:
+        rank = []
+    else:
+        if initial is not None:
+            rank = list(initial)
+        elif teleport is not None:
+            rank = list(teleport)
+        else:
+            rank = [1 / n] * n
+        rank, converged = SOLVERS[method](
+            graph, damping_factor, rank, tolerance, NORMS[norm], residuals,
+            teleport=teleport, max_iterations=max_iterations
+        )
+        total = sum(rank)
+        rank = [value / total for value in rank]
+    if report is not None:
+        report["method"] = method
+        report["norm"] = norm
+        report["tolerance"] = tolerance
+        report["iterations"] = len(residuals)
+        report["residuals"] = residuals
+        report["converged"] = converged
+        report["seconds"] = time.perf_counter() - start
+    return rank
+
+
+def _power_stepper(graph, damping_factor, teleport=None):
+    """
+    Return a function mapping a rank list to the next power iteration,
+    teleporting to pages in proportion to the list `teleport` if given
+    and uniformly if not.
+    """
+    n = len(graph)
+    in_offsets, in_sources = graph.inbound()
+    dangling = graph.dangling()
+    # Fraction of a page's rank passed along each of its links
+    weights = _link_weights(graph, damping_factor)
+    gather_inflow = _gatherer(in_sources)
+    if teleport is not None:
+        jumps = _jumps(n, damping_factor, teleport)
+
+    def step(rank):
+        shares = list(map(mul, rank, weights))
+        dangling_rank = sum(rank[i] for i in dangling)
+        base = (1 - damping_factor + damping_factor * dangling_rank) / n
+        # Sum the shares flowing into each page as differences of a
+        # running total over all links, grouped by target page
+        totals = list(accumulate(gather_inflow(shares), initial=0.0))
+        bounds = list(map(totals.__getitem__, in_offsets))
+        inflows = map(sub, bounds[1:], bounds[:-1])
+        if teleport is None:
+            return [base + inflow for inflow in inflows]
+        spread = damping_factor * dangling_rank / n
+        return [
+            jump + spread + inflow for jump, inflow in zip(jumps, inflows)
+        ]
+
+    return step
+
+
+def _solve_power(graph, damping_factor, rank, tolerance, norm, residuals,
+                 teleport=None, max_iterations=MAX_ITERATIONS):
+    """Plain power (Jacobi) iteration."""
+    step = _power_stepper(graph, damping_factor, teleport)
+    while len(residuals) < max_iterations:
+        new_rank = step(rank)
+        residuals.append(norm(new_rank, rank))
+        rank = new_rank
+        if residuals[-1] < tolerance:
+            return rank, True
+    return rank, False
+
+
+def _solve_gauss_seidel(graph, damping_factor, rank, tolerance, norm,
+                        residuals, teleport=None,
+                        max_iterations=MAX_ITERATIONS):
+    """
+    Gauss-Seidel iteration: each page is updated in place, so pages
+    later in a sweep already see the new ranks of earlier ones.
+    """
+    n = len(graph)
+    in_offsets, in_sources = graph.inbound()
+    weights = _link_weights(graph, damping_factor)
+    dangling = graph.dangling()
+    is_dangling = bytearray(n)
+    for i in dangling:
+        is_dangling[i] = 1
+    dangling_rank = sum(rank[i] for i in dangling)
+    jumps = _jumps(n, damping_factor, teleport)
+    while len(residuals) < max_iterations:
+        previous = list(rank)
+        for i in range(n):
+            value = jumps[i] + damping_factor * dangling_rank / n + sum(
+                rank[j] * weights[j]
+                for j in in_sources[in_offsets[i]:in_offsets[i + 1]]
+            )
+            if is_dangling[i]:
+                dangling_rank += value - rank[i]
+            rank[i] = value
+        # In-place sweeps do not preserve the total rank, so rescale it
+        total = sum(rank)
+        rank[:] = [value / total for value in rank]
+        dangling_rank /= total
+        residuals.append(norm(rank, previous))
+        if residuals[-1] < tolerance:
+            return rank, True
+    return rank, False
+
+
+def _solve_extrapolated(graph, damping_factor, rank, tolerance, norm,
+                        residuals, teleport=None,
+                        max_iterations=MAX_ITERATIONS):
+    """
+    Power iteration with Aitken extrapolation applied to each page's
+    last three iterates, at most every `EXTRAPOLATE_EVERY` iterations and
+    only once the residuals shrink by a steady ratio, which is when the
+    error is dominated by a single geometric term. An extrapolation is
+    kept only if the iteration from it has a smaller residual than the
+    last one; otherwise iteration carries on as if it had not happened.
+    """
+    step = _power_stepper(graph, damping_factor, teleport)
+    history = [rank]
+    since = 0
+    while len(residuals) < max_iterations:
+        new_rank = step(rank)
+        residuals.append(norm(new_rank, rank))
+        rank = new_rank
+        if residuals[-1] < tolerance:
+            return rank, True
+        history = history[-2:] + [rank]
+        since += 1
+        if since < EXTRAPOLATE_EVERY or len(history) < 3 \
+                or not _steady(residuals[-3:]):
+            continue
+
+        since = 0
+        candidate = _aitken(*history)
+        candidate_next = step(candidate)
+        residuals.append(norm(candidate_next, candidate))
+        if residuals[-1] < residuals[-2]:
+            rank = candidate_next
+            history = [candidate, candidate_next]
+            if residuals[-1] < tolerance:
+                return rank, True
+    return rank, False
+
+
+def _steady(residuals):
+    """
+    Return whether three successive residuals shrink by nearly the same
+    ratio.
+    """
+    a, b, c = residuals
+    if a == 0 or b == 0:
+        return False
+    return abs(c / b - b / a) < 0.01
+
+
+def _aitken(x0, x1, x2):
+    """
+    Return the Aitken delta-squared extrapolation of three successive
+    iterates, keeping the latest value wherever it is ill-conditioned.
+    """
+    result = []
+    for a, b, c in zip(x0, x1, x2):
+        denominator = c - 2 * b + a
+        if abs(denominator) > 1e-15:
+            value = c - (c - b) ** 2 / denominator
+            result.append(value if value > 0 else c)
+        else:
+            result.append(c)
+    total = sum(result)
+    return [value / total for value in result]
+
+
+def _solve_adaptive(graph, damping_factor, rank, tolerance, norm,
+                    residuals, teleport=None, max_iterations=MAX_ITERATIONS):
+    """
+    Adaptive power iteration: a page is recomputed only if one of the
+    pages linking to it changed by more than `tolerance` divided by the
+    number of pages in the last iteration; the rest are frozen. Every
+    `ADAPTIVE_CHECK_EVERY` iterations, once every page is frozen, or
+    when the rank of dangling pages shifts, a full iteration is made
+    instead; it decides convergence and unfreezes everything.
+    """
+    n = len(graph)
+    in_offsets, in_sources = graph.inbound()
+    weights = _link_weights(graph, damping_factor)
+    dangling = graph.dangling()
+    step = _power_stepper(graph, damping_factor, teleport)
+    jumps = _jumps(n, damping_factor, teleport)
+    threshold = tolerance / n
+    active = []
+    spread = None
+    iteration = 0
+    while len(residuals) < max_iterations:
+        # Rank of pages without links, spread over every page
+        dangling_rank = sum(rank[i] for i in dangling)
+        new_spread = damping_factor * dangling_rank / n
+        if (not active or iteration % ADAPTIVE_CHECK_EVERY == 0
+                or abs(new_spread - spread) > threshold):
+            new_rank = step(rank)
+            residuals.append(norm(new_rank, rank))
+            if residuals[-1] < tolerance:
+                return new_rank, True
+            candidates = range(n)
+        else:
+            shares = list(map(mul, rank, weights))
+            new_rank = list(rank)
+            for i in active:
+                new_rank[i] = jumps[i] + new_spread + sum(map(
+                    shares.__getitem__,
+                    in_sources[in_offsets[i]:in_offsets[i + 1]]
+                ))
+            residuals.append(norm(new_rank, rank))
+            candidates = active
+        changed = set()
+        for i in candidates:
+            if abs(new_rank[i] - rank[i]) > threshold:
+                changed.update(graph.links(i))
+        active = sorted(changed)
+        spread = new_spread
+        rank = new_rank
+        iteration += 1
+    return rank, False
+
+
+def _jumps(n, damping_factor, teleport):
+    """
+    Return the rank each of `n` pages receives from random jumps, in
+    proportion to the list `teleport` if given and uniformly if not.
+    """
+    if teleport is None:
+        return [(1 - damping_factor) / n] * n
+    return [(1 - damping_factor) * share for share in teleport]
+
+
+def _link_weights(graph, damping_factor):
+    """
+    Return the fraction of each page's rank passed along each of its
+    links: the damping factor divided by its number of links.
+    """
+    return [
+        damping_factor / graph.out_degree(i) if graph.out_degree(i) else 0
+        for i in range(len(graph))
+    ]
+
+
+def _l1(a, b):
+    return sum(map(abs, map(sub, a, b)))
+
+
+def _l2(a, b):
+    return math.sqrt(sum(x * x for x in map(sub, a, b)))
+
+
+def _max(a, b):
+    return max(map(abs, map(sub, a, b)))
+
+
+# Each solver returns the final rank list and whether the change between
+# iterations fell below the tolerance before the iteration limit
+SOLVERS = {
+    "power": _solve_power,
+    "gauss-seidel": _solve_gauss_seidel,
+    "extrapolation": _solve_extrapolated,
+    "adaptive": _solve_adaptive,
+}
+
+NORMS = {
+    "l1": _l1,
+    "l2": _l2,
+    "max": _max,
+}
+
+
+def personalized_pagerank(corpus, damping_factor, teleport,
+                          tolerance=TOLERANCE, method="power",
+                          max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for each page of `corpus` for a random surfer
+    who, instead of jumping to a page chosen uniformly at random, jumps
+    to the pages in `teleport`: either a dictionary mapping pages to
+    weights or a collection of pages weighted equally.
+    """
+    graph = as_graph(corpus)
+    return graph.ranks(solve_pagerank(
+        graph, damping_factor, method, tolerance,
+        teleport=teleport_vector(graph, teleport),
+        max_iterations=max_iterations
+    ))
+
+
+def teleport_vector(graph, teleport):
+    """
+    Return the list of probabilities of jumping to each page of `graph`
+    given `teleport`, a dictionary mapping pages to non-negative weights
+    or a collection of pages weighted equally.
+
+    Only random jumps follow the distribution; pages without links still
+    pass their rank to every page. This keeps personalized ranks linear
+    in the distribution: the ranks for a mixture of distributions are
+    the same mixture of their ranks.
+    """
+    if not isinstance(teleport, dict):
+        teleport = dict.fromkeys(teleport, 1)
+    index = {page: i for i, page in enumerate(graph.pages)}
+    vector = [0.0] * len(graph)
+    for page, weight in teleport.items():
+        if page not in index:
+            raise ValueError(f"{page!r} is not in the corpus")
+        if weight < 0:
+            raise ValueError(f"negative teleport weight for {page!r}")
+        vector[index[page]] += weight
+    total = sum(vector)
+    if total <= 0:
+        raise ValueError("teleport weights must not all be zero")
+    return [weight / total for weight in vector]
+
+
+class TopicRanks():
+    """
+    Personalized PageRank for named topics, each defined by a teleport
+    distribution as accepted by `teleport_vector`.
+
+    The rank list of each topic is computed when first needed and kept
+    in a cache of at most `capacity` topics, evicting the least recently
+    used. Because personalized ranks are linear in the teleport
+    distribution, any weighted mixture of topics is answered by the
+    same mixture of their cached rank lists, without iterating again.
+    """
+
+    def __init__(self, corpus, damping_factor=DAMPING, topics=None,
+                 capacity=TOPIC_CACHE_SIZE, tolerance=TOLERANCE,
+                 method="power"):
+        self.graph = as_graph(corpus)
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.method = method
+        self.capacity = capacity
+        self.topics = {}
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        for name, teleport in (topics or {}).items():
+            self.define(name, teleport)
+
+    def define(self, name, teleport):
+        """Add or replace the topic `name`."""
+        self.topics[name] = teleport_vector(self.graph, teleport)
+        self.cache.pop(name, None)
+
+    def vector(self, name):
+        """Return the list of personalized ranks of topic `name`."""
+        if name in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(name)
+            return self.cache[name]
+        if name not in self.topics:
+            raise KeyError(name)
+        self.misses += 1
+        rank = solve_pagerank(
+            self.graph, self.damping_factor, self.method, self.tolerance,
+            teleport=self.topics[name]
+        )
+        self.cache[name] = rank
+        if len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return rank
+
+    def ranks(self, mixture):
+        """
+        Return a {page: rank} dictionary for a mixture of topics, given
+        as a topic name or a dictionary mapping names to non-negative
+        weights, which are scaled to sum to 1.
+        """
+        if not isinstance(mixture, dict):
+            mixture = {mixture: 1}
+        if any(weight < 0 for weight in mixture.values()):
+            raise ValueError("topic weights must not be negative")
+        total = sum(mixture.values())
+        if total <= 0:
+            raise ValueError("topic weights must not all be zero")
+        rank = [0.0] * len(self.graph)
+        for name, weight in mixture.items():
+            if weight:
+                scale = weight / total
+                rank = [
+                    value + scale * topic
+                    for value, topic in zip(rank, self.vector(name))
+                ]
+        return self.graph.ranks(rank)
+
+
+def update_pagerank(directory, state_file, damping_factor,
+                    tolerance=TOLERANCE, local=False, workers=1,
+                    method="power", norm="l1",
+                    max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for the pages under `directory`, reusing the
+    links and ranks saved in `state_file` by the previous call.
+
+    Only pages that were added or whose size or modification time changed
+    are parsed again. Iteration with the named solver in `SOLVERS` starts
+    from the previous ranks, so few sweeps are needed when little has
+    changed, and makes at most `max_iterations` iterations. If `local` is true, ranks are instead re-propagated outwards
+    from the pages whose links changed, only for as long as the changes
+    exceed `tolerance` (see `propagate`), and `method` and `norm` are
+    not used. The new links and ranks are saved back to `state_file`.
+
+    Return the ranks dictionary and a report counting the pages added,
+    removed and modified and the page updates made.
+    """
+    state = _load_state(state_file, damping_factor)
+    old_pages = state["pages"]
+
+    current = {}
+    changed = []
+    for page in find_pages(directory):
+        info = os.stat(os.path.join(directory, page))
+        current[page] = [info.st_size, info.st_mtime_ns]
+        previous = old_pages.get(page)
+        if previous is None or previous[:2] != current[page]:
+            changed.append(page)
+    for page, links in extract_pages(directory, changed, workers):
+        current[page].append(sorted(links))
+    for page, entry in current.items():
+        if len(entry) == 2:
+            entry.append(old_pages[page][2])
+
+    added = sum(1 for page in changed if page not in old_pages)
+    removed = [page for page in old_pages if page not in current]
+    report = {
+        "added": added,
+        "removed": len(removed),
+        "modified": len(changed) - added,
+    }
+
+    corpus = {
+        page: set(link for link in entry[2] if link in current)
+        for page, entry in current.items()
+    }
+    graph = LinkGraph.from_corpus(corpus)
+    index = {page: i for i, page in enumerate(graph.pages)}
+
+    # Pages whose in-links may have changed: pages whose own links
+    # changed, and everything those pages and removed pages linked to
+    affected = set()
+    for page, links in corpus.items():
+        old_links = set(
+            link for link in old_pages.get(page, [0, 0, []])[2]
+            if link in old_pages
+        )
+        if page not in old_pages or links != old_links:
+            affected.add(page)
+            affected.update(links)
+            affected.update(old_links)
+    for page in removed:
+        affected.update(old_pages[page][2])
+    affected = [index[page] for page in affected if page in index]
+
+    n = len(graph)
+    old_ranks = state["ranks"]
+    initial = [old_ranks.get(page, 1 / n) for page in graph.pages]
+    total = sum(initial)
+    initial = [value / total for value in initial] if total else initial
+
+    # The previous ranks were in balance with the rank then teleported
+    # to every page, scaled along with them above
+    swept = state.get("teleported")
+    if swept is not None and total:
+        swept /= total
+
+    if not old_ranks:
+        rank = solve_pagerank(graph, damping_factor, method, tolerance, norm,
+                              max_iterations=max_iterations)
+        report["updates"] = None
+    elif local:
+        rank = initial
+        if swept is None and len(old_ranks) != n:
+            # Without the previous teleported rank, pages away from the
+            # changes cannot be trusted once the page count changes
+            affected = range(n)
+        report["updates"] = propagate(
+            graph, damping_factor, rank, affected, tolerance, swept
+        )
+    else:
+        rank = solve_pagerank(graph, damping_factor, method, tolerance, norm,
+                              initial, max_iterations=max_iterations)
+        report["updates"] = None
+
+    ranks = graph.ranks(rank)
+    _save_state(state_file, {
+        "damping": damping_factor,
+        "pages": current,
+        "ranks": ranks,
+        "teleported": _teleported(graph, damping_factor, rank),
+    })
+    return ranks, report
+
+
+def propagate(graph, damping_factor, rank, seeds, tolerance=TOLERANCE,
+              teleported=None):
+    """
+    Update the list `rank` in place by Gauss-Seidel updates of single
+    pages, starting with the page indices in `seeds` and queueing the
+    pages a page links to whenever its rank moves by more than
+    `tolerance` divided by the number of pages.
+
+    Every page receives the same rank from random jumps and from pages
+    without links, and the ranks solving the equations for any fixed
+    value of it are a multiple of the PageRank. Updates therefore hold
+    it at `teleported`, the value the pages outside `seeds` were last
+    computed with, and the ranks are rescaled to sum to 1 at the end,
+    so changes to the rank of pages without links spread no further
+    than any other change. By default `teleported` is the current
+    value, which only holds if the number of pages has not changed.
+    Return the number of page updates made.
+    """
+    if not tolerance > 0:
+        raise ValueError(f"tolerance must be positive, not {tolerance}")
+    n = len(graph)
+    if n == 0:
+        return 0
+    in_offsets, in_sources = graph.inbound()
+    degrees = [graph.out_degree(i) for i in range(n)]
+    threshold = tolerance / n
+    if teleported is None:
+        teleported = _teleported(graph, damping_factor, rank)
+
+    queue = deque(seeds)
+    queued = bytearray(n)
+    for i in queue:
+        queued[i] = 1
+    updates = 0
+    while queue:
+        i = queue.popleft()
+        queued[i] = 0
+        inflow = sum(
+            rank[j] / degrees[j]
+            for j in in_sources[in_offsets[i]:in_offsets[i + 1]]
+        )
+        value = teleported + damping_factor * inflow
+        change = value - rank[i]
+        rank[i] = value
+        updates += 1
+        if abs(change) > threshold:
+            for target in graph.links(i):
+                if not queued[target]:
+                    queued[target] = 1
+                    queue.append(target)
+
+    total = sum(rank)
+    rank[:] = [value / total for value in rank]
+    return updates
+
+
+def _teleported(graph, damping_factor, rank):
+    """
+    Return the rank every page of `graph` receives from random jumps and
+    from pages without links, given the list `rank`.
+    """
+    n = len(graph)
+    if n == 0:
+        return None
+    dangling_rank = sum(rank[i] for i in graph.dangling())
+    return (1 - damping_factor + damping_factor * dangling_rank) / n
+
+
+def _load_state(filename, damping_factor):
+    """
+    Return the state saved by `update_pagerank`, or an empty state if
+    there is none or it was computed with another damping factor.
+    """
+    empty = {"damping": damping_factor, "pages": {}, "ranks": {}}
+    try:
+        with open(filename, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return empty
+    if state.get("damping") != damping_factor:
+        return {**empty, "pages": state.get("pages", {})}
+    return state
+
+
+def _save_state(filename, state):
+    tmp = f"{filename}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, filename)
+
+
+def _gatherer(indices):
+    """
+    Returns a function that picks the items at `indices` out of a list,
+    looping in C rather than Python.
+    """
+    if len(indices) < 2:
+        return lambda values: [values[i] for i in indices]
+    return itemgetter(*indices)
+
+
+def as_graph(corpus):
+    """
+    Returns `corpus` as a LinkGraph, compiling it if it is a dictionary.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+import os
+import random
+import tempfile
+import unittest
+
+import pagerank
+from graph import LinkGraph
+
+
+class SolverTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.corpus = {
+            f"{i}.html": set(
+                f"{rng.randrange(60)}.html" for _ in range(rng.randrange(4))
+            )
+            for i in range(60)
+        }
+
+    def test_iteration_limit(self):
+        # Rounding keeps some solvers' residuals above a tolerance this small
+        for method in pagerank.SOLVERS:
+            with self.subTest(method=method):
+                report = {}
+                ranks = pagerank.iterate_pagerank(
+                    self.corpus, pagerank.DAMPING, 1e-30, method=method,
+                    report=report, max_iterations=50
+                )
+                self.assertLessEqual(report["iterations"], 50)
+                self.assertFalse(report["converged"])
+                self.assertAlmostEqual(sum(ranks.values()), 1)
+
+    def test_converges(self):
+        for method in pagerank.SOLVERS:
+            with self.subTest(method=method):
+                report = {}
+                pagerank.iterate_pagerank(self.corpus, pagerank.DAMPING,
+                                          method=method, report=report)
+                self.assertTrue(report["converged"])
+
+    def test_rejects_non_positive_tolerance(self):
+        with self.assertRaises(ValueError):
+            pagerank.iterate_pagerank(self.corpus, pagerank.DAMPING, 0)
+
+
+class GraphFileTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.filename = os.path.join(tmp.name, "graph.bin")
+        self.graph = LinkGraph.from_corpus({
+            "a.html": {"b.html", "c.html"},
+            "b.html": {"c.html"},
+            "c.html": {"a.html"},
+            "dangling.html": set(),
+        })
+        self.graph.save(self.filename, source="corpus")
+
+    def test_round_trip(self):
+        graph = LinkGraph.load(self.filename, "corpus")
+        self.assertEqual(list(graph.pages), list(self.graph.pages))
+        for i in range(len(graph)):
+            self.assertEqual(list(graph.links(i)),
+                             list(self.graph.links(i)))
+        self.assertIsNone(LinkGraph.load(self.filename, "other"))
+
+    def test_rejects_truncated_file(self):
+        with open(self.filename, "rb") as f:
+            data = f.read()
+        with open(self.filename, "wb") as f:
+            f.write(data[:-1])
+        self.assertIsNone(LinkGraph.load(self.filename))
+
+
+class SamplingTest(unittest.TestCase):
+
+    def test_rejects_no_samples(self):
+        corpus = {"1.html": {"2.html"}, "2.html": set()}
+        with self.assertRaises(ValueError):
+            pagerank.sample_pagerank(corpus, pagerank.DAMPING, 0)
+        with self.assertRaises(ValueError):
+            pagerank.sample_pagerank_parallel(corpus, pagerank.DAMPING, 0)
+
+
+class UpdatePageRankTest(unittest.TestCase):
+    """
+    Incremental updates should agree with a full solve of the corpus as
+    it stands, including after pages are added or removed, which changes
+    the rank every page receives from random jumps.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.corpus = os.path.join(self.tmp.name, "corpus")
+        self.state = os.path.join(self.tmp.name, "state.json")
+        os.mkdir(self.corpus)
+        self.rng = random.Random(0)
+        # Two clusters of pages that do not link to each other
+        for cluster in "ab":
+            for i in range(100):
+                self.write(f"{cluster}{i}.html", [
+                    f"{cluster}{self.rng.randrange(100)}.html"
+                    for _ in range(3)
+                ])
+
+    def write(self, page, links):
+        with open(os.path.join(self.corpus, page), "w") as f:
+            f.write("".join(f'<a href="{link}">link</a>' for link in links))
+
+    def assertMatchesFullSolve(self, ranks):
+        expected = pagerank.iterate_pagerank(
+            pagerank.crawl(self.corpus), pagerank.DAMPING
+        )
+        self.assertEqual(set(ranks), set(expected))
+        error = sum(abs(ranks[page] - expected[page]) for page in expected)
+        self.assertLess(error, 1e-4)
+
+    def check_add_and_remove(self, local):
+        pagerank.update_pagerank(self.corpus, self.state, pagerank.DAMPING)
+
+        for i in range(100, 150):
+            self.write(f"a{i}.html", [
+                f"a{self.rng.randrange(100)}.html" for _ in range(2)
+            ])
+        ranks, report = pagerank.update_pagerank(
+            self.corpus, self.state, pagerank.DAMPING, local=local
+        )
+        self.assertEqual(report["added"], 50)
+        self.assertMatchesFullSolve(ranks)
+
+        for i in range(100, 150):
+            os.remove(os.path.join(self.corpus, f"a{i}.html"))
+        ranks, report = pagerank.update_pagerank(
+            self.corpus, self.state, pagerank.DAMPING, local=local
+        )
+        self.assertEqual(report["removed"], 50)
+        self.assertMatchesFullSolve(ranks)
+
+    def test_local_update_stays_local(self):
+        # A small cluster of its own in which half the pages have no links
+        for i in range(10):
+            self.write(f"c{i}.html", [f"c{(i + 1) % 10}.html"] if i % 2
+                       else [])
+        pagerank.update_pagerank(self.corpus, self.state, pagerank.DAMPING)
+
+        # Changing the rank held by pages without links should not
+        # send updates through the other clusters
+        self.write("c1.html", ["c4.html", "c6.html"])
+        ranks, report = pagerank.update_pagerank(
+            self.corpus, self.state, pagerank.DAMPING, local=True
+        )
+        self.assertLess(report["updates"], 100)
+        self.assertMatchesFullSolve(ranks)
+
+    def test_update(self):
+        self.check_add_and_remove(local=False)
+
+    def test_local_update(self):
+        self.check_add_and_remove(local=True)
+
+
+if __name__ == "__main__":
+    unittest.main()